@@ -113,6 +113,19 @@ class TestIntSet(unittest.TestCase):
                 print(cont_all)
                 self.fail()
 
+            a = random.randint(-10,10)
+            if random.randint(0,3) > 0:
+                b = a + random.randint(0,10)
+            else:
+                b = None
+            res = int_set1.window_union(a,b)
+            if not check_window_union(int_set1, a, b, res):
+                print("failed window union")
+                print(int_set1)
+                print(f"a : {a}, b: {b}")
+                print(res)
+                self.fail()
+
             if(int_set1.is_inf()):
                 n = int_set1.min_inf_start()
                 if not check_min_inf_start(int_set1, n):
@@ -121,6 +134,19 @@ class TestIntSet(unittest.TestCase):
 
 
 
+def check_window_union(int_set1 : IntegerSet, a, b, int_result):
+    # compares {t+n | t in int_set1, n in [a,b]} with the result below 150 (get_deterministic covers [0,200))
+    det_set1 = int_set1.get_deterministic()
+    expected = set()
+    for t in det_set1:
+        if b == None:
+            expected.update(range(max(0, t+a), 200))
+        else:
+            expected.update(n for n in range(t+a, t+b+1) if n >= 0)
+
+    det_result = int_result.get_deterministic()
+    return all((i in expected) == (i in det_result) for i in range(150))
+
 def check_union_deterministic(int_set1 : IntegerSet, int_set2, int_result):
     set1 = int_set1.get_deterministic()
     set2 = int_set2.get_deterministic()
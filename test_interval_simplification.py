@@ -0,0 +1,781 @@
+import time
+import random
+import asyncio
+import unittest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import tl_simplification.ltl as LTL
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+from tl_simplification.simplification.predicate_checker import PredicateChecker
+from tl_simplification.simplification.options import SimplificationOptions
+from tl_simplification.interval_simplification import interval_simplification, interval_decision
+from tl_simplification.lazy_simplification import LazySimplification
+from tl_simplification.simplification.simplify import simplify_G, simplify_AND, simplify_multi
+from tl_simplification.simplification.segments import PrefixG
+from tl_simplification.simplification.propagate_interval import propagate_interval
+from tl_simplification.simplification.compact import compact, compact_mapping
+from tl_simplification.simplification.cost import CostModel
+from tl_simplification.simplification.statistics import SimplificationStatistics
+from tl_simplification.simplification.normalize import normalize
+from tl_simplification.simplification.canonical import canonicalize
+from tl_simplification.simplification.budget import Budget
+from tl_simplification.simplification.finite import clip_mapping
+from tl_simplification.simplification.async_predicate_checker import AsyncPredicateChecker
+from tl_simplification.simplification.predicate_cache import PredicateCache
+
+
+class KnowledgeChecker(PredicateChecker):
+
+    """
+    - "a" is true in [0,10] and false in [20,30]
+    - "b" is true in [5,15] and false from 40 on
+    - "c" is false in [0,3]
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.add_predicate("a", KnowledgeChecker.interval_a, 0)
+        self.add_predicate("b", KnowledgeChecker.interval_b, 0)
+        self.add_predicate("c", KnowledgeChecker.interval_c, 0)
+
+    def interval_a(input):
+        return IntegerSet.from_interval([0,10]), IntegerSet.from_interval([20,30])
+
+    def interval_b(input):
+        return IntegerSet.from_interval([5,15]), IntegerSet([40], True)
+
+    def interval_c(input):
+        return IntegerSet.empty(), IntegerSet.from_interval([0,3])
+
+
+def get_formulas():
+    a = LTL.pred("a", [])
+    b = LTL.pred("b", [])
+    c = LTL.pred("c", [])
+    return [
+        LTL.always(LTL.implies(a, LTL.next(LTL._or(b, c)))),
+        LTL.always(LTL._or(a, c), [2,6]),
+        LTL.eventually(LTL._and(b, c), [0,8]),
+        LTL.eventually(LTL.always(a, [0,3]), [1,4]),
+        LTL.conjunction([LTL.always(b, [0,2]), LTL.next(c, 3), LTL.eventually(a, [1,5])]),
+        LTL.disjunction([LTL._not(a), LTL.always(c, [0,4]), b]),
+    ]
+
+
+def get_position_sets():
+    return [
+        IntegerSet([0], False),
+        IntegerSet.from_interval([0,45]),
+        IntegerSet([1,7,8,33], False),
+        IntegerSet([3], True),
+    ]
+
+
+def same_mapping(S1, S2, I):
+    # Compares two simplification mappings at all positions in I (up to position 80)
+    return all(S1.get_at_timestep(t) == S2.get_at_timestep(t) for t in range(0, 80) if I.contains(t))
+
+
+def holds_finite(exp, trace, t):
+    # Reference evaluation of exp at position t of the finite trace (dict: predicate name -> list of truth values)
+    N = len(trace["a"])
+    match exp:
+        case Wahr(): return True
+        case Falsch(): return False
+        case Predicate(name, _): return trace[name][t]
+        case UnaryExpression(LogicUnOp("not"), sub): return not holds_finite(sub, trace, t)
+        case UnaryExpression(TempUnOp(op, (a,b)), sub):
+            match op:
+                case "X": return t+a < N and holds_finite(sub, trace, t+a)
+                case "P": return t-a >= 0 and holds_finite(sub, trace, t-a)
+                case "O": return any(holds_finite(sub, trace, t-n) for n in range(a, (t if b == None else min(b, t))+1))
+            window = [t+n for n in range(a, (N-1-t if b == None else b)+1) if t+n < N]
+            if op == "G":
+                return all(holds_finite(sub, trace, i) for i in window)
+            return any(holds_finite(sub, trace, i) for i in window)
+        case BinaryExpression(TempBinOp("U", (a,b)), exp_l, exp_r):
+            for n in range(0, (N-1-t if b == None else min(b, N-1-t))+1):
+                if n >= a and holds_finite(exp_r, trace, t+n): return True
+                if not holds_finite(exp_l, trace, t+n): return False
+            return False
+        case BinaryExpression(LogicBinOp(op), exp_l, exp_r):
+            l, r = holds_finite(exp_l, trace, t), holds_finite(exp_r, trace, t)
+            return {"and": l and r, "or": l or r, "imp": (not l) or r, "iff": l == r}[op]
+        case MultiExpression(LogicMultiOp(op), expressions):
+            values = [holds_finite(sub, trace, t) for sub in expressions]
+            return all(values) if op == "conjunction" else any(values)
+
+
+def knowledge_traces(pred_check, N, count, seed=0):
+    # Random finite traces of length N for the predicates a, b and c that agree with the knowledge of pred_check
+    rng = random.Random(seed)
+    traces = []
+    for _ in range(count):
+        trace = {}
+        for name in ["a", "b", "c"]:
+            I_true, I_false = pred_check.check_predicate(name, [])
+            trace[name] = [I_true.contains(t) or (not I_false.contains(t) and rng.random() < 0.5) for t in range(N)]
+        traces.append(trace)
+    return traces
+
+
+def equivalent_at(exp1, exp2, t, traces):
+    # Compares the truth values of two formulas at position t on the traces
+    return all(holds_finite(exp1, trace, t) == holds_finite(exp2, trace, t) for trace in traces)
+
+
+class TestIntervalSimplification(unittest.TestCase):
+
+    def test_chunked_threads(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            options = SimplificationOptions(executor=executor, chunk_size=3)
+            for exp in get_formulas():
+                for I in get_position_sets():
+                    S = interval_simplification(exp, I, KnowledgeChecker())
+                    S_chunked = interval_simplification(exp, I, KnowledgeChecker(), options)
+                    self.assertTrue(same_mapping(S, S_chunked, I), f"{exp} at {I}")
+
+    def test_parallel_subtrees(self):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            options = SimplificationOptions(subtree_executor=executor, min_subtree_size=2)
+            for exp in get_formulas():
+                for I in get_position_sets():
+                    S = interval_simplification(exp, I, KnowledgeChecker())
+                    S_parallel = interval_simplification(exp, I, KnowledgeChecker(), options)
+                    self.assertTrue(same_mapping(S, S_parallel, I), f"{exp} at {I}")
+
+    def test_prefix_G(self):
+        # PrefixG has to agree with simplify_G(IntegerSet([t]), S, 0, x-t-1) for non empty prefixes
+        for exp in get_formulas():
+            S = interval_simplification(exp, IntegerSet.from_interval([0,60]), KnowledgeChecker())
+            prefix_G = PrefixG(S)
+            for t in range(0, 40, 3):
+                for x in range(t+1, t+15):
+                    expected = simplify_G(IntegerSet([t], False), S, 0, x-t-1).get_at_timestep(t)
+                    self.assertEqual(prefix_G.at(t, x), expected, f"{exp} at t={t}, x={x}")
+            self.assertEqual(prefix_G.at(5, 5), Wahr())
+
+    def test_symbolic(self):
+        options = SimplificationOptions(symbolic=True)
+        for exp in get_formulas():
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                S_symbolic = interval_simplification(exp, I, KnowledgeChecker(), options)
+                self.assertTrue(same_mapping(S, S_symbolic, I), f"{exp} at {I}")
+                self.assertTrue(len(S_symbolic.expressions()) <= len(S.expressions()))
+
+        # segments of a periodic mapping only differ by a shift and have to share their family
+        pred_check = PredicateChecker()
+        pred_check.add_predicate("a", lambda input: (IntegerSet(list(range(0, 601, 3)), False), IntegerSet.empty()), 0)
+        exp = LTL.always(LTL.pred("a", []), [0,20])
+        I = IntegerSet.from_interval([0,600])
+        S = interval_simplification(exp, I, pred_check)
+        S_symbolic = interval_simplification(exp, I, pred_check, options)
+        self.assertTrue(same_mapping(S, S_symbolic, I))
+        self.assertTrue(all(S.get_at_timestep(t) == S_symbolic.get_at_timestep(t) for t in range(80, 620)))
+        self.assertTrue(len(S_symbolic.expressions()) <= len(S.expressions()))
+
+    def test_symbolic_nested(self):
+        # parents of a symbolic G / F must not treat its residual family as one formula
+        pred_check = PredicateChecker()
+        pred_check.add_predicate("b", lambda input: (IntegerSet([1,2,3,4,6,7], False), IntegerSet.empty()), 0)
+        b, c = LTL.pred("b", []), LTL.pred("c", [])
+        G_b = LTL.always(b, [0,2])
+        I = IntegerSet.from_interval([0,5])
+        options = SimplificationOptions(symbolic=True)
+        for exp in [LTL._and(c, G_b), LTL._or(c, LTL.eventually(LTL._not(b), [0,2])), LTL.iff(c, G_b), LTL.next(G_b), LTL.always(G_b, [0,1])]:
+            S = interval_simplification(exp, I, pred_check)
+            S_symbolic = interval_simplification(exp, I, pred_check, options)
+            self.assertTrue(same_mapping(S, S_symbolic, I), f"{exp}")
+        S_symbolic = interval_simplification(LTL._and(c, G_b), I, pred_check, options)
+        self.assertEqual(S_symbolic.get_at_timestep(4), LTL._and(c, LTL.always(b, [1,1])))
+
+    def test_flat_conjunction(self):
+        # simplify_multi has to decide the same positions as the pairwise fold and emit one flat conjunction otherwise
+        children = [LTL.next(LTL.pred(name, []), n) for n in range(0, 12, 3) for name in ["a", "b", "c"]]
+        I = IntegerSet.from_interval([0,60])
+        S_sub = [interval_simplification(child, I, KnowledgeChecker()) for child in children]
+        S = simplify_multi(LogicMultiOp("conjunction"), I, S_sub)
+
+        S_fold = S_sub[0]
+        for S_i in S_sub[1:]:
+            S_fold = simplify_AND(I, S_fold, S_i)
+        self.assertTrue(S.get_I(Wahr()).equals(S_fold.get_I(Wahr())))
+        self.assertTrue(S.get_I(Falsch()).equals(S_fold.get_I(Falsch())))
+
+        for t in I.without(S.get_I(Wahr()).union(S.get_I(Falsch()))):
+            operands = [S_i.get_at_timestep(t) for S_i in S_sub if S_i.get_at_timestep(t) != Wahr()]
+            self.assertEqual(S.get_at_timestep(t), LTL.conjunction(operands), f"t={t}")
+
+    def test_compact(self):
+        a = LTL.pred("a", [])
+        b = LTL.pred("b", [])
+        self.assertEqual(compact(LTL._and(LTL.always(a, [0,3]), LTL.always(a, [4,9]))), LTL.always(a, [0,9]))
+        self.assertEqual(compact(LTL.disjunction([LTL.eventually(a, [2,6]), LTL.eventually(a, [0,3]), b])),
+                         LTL.disjunction([LTL.eventually(a, [0,6]), b]))
+        self.assertEqual(compact(LTL.conjunction([a, LTL._and(b, a), Wahr()])), LTL.conjunction([a, b]))
+        self.assertEqual(compact(LTL._and(a, LTL._or(a, b))), a)
+        self.assertEqual(compact(LTL._and(LTL.always(a, [0,5]), LTL.eventually(a, [5,8]))), LTL.always(a, [0,5]))
+        self.assertEqual(compact(LTL._and(LTL.always(a, [0,5]), LTL.eventually(a, [6,8]))),
+                         LTL.conjunction([LTL.always(a, [0,5]), LTL.eventually(a, [6,8])]))
+        self.assertEqual(compact(LTL.disjunction([LTL.always(b, [1,2]), Falsch()])), LTL.always(b, [1,2]))
+
+        # on a finite trace G does not imply F: G[0,5] a & F[5,8] a is false at the last position but G[0,5] a is not
+        G_and_F = LTL._and(LTL.always(a, [0,5]), LTL.eventually(a, [5,8]))
+        trace = {"a": [True] * 6, "b": [True] * 6, "c": [True] * 6}
+        self.assertNotEqual(holds_finite(G_and_F, trace, 5), holds_finite(compact(G_and_F), trace, 5))
+        self.assertEqual(compact(G_and_F, 6), LTL.conjunction([LTL.always(a, [0,5]), LTL.eventually(a, [5,8])]))
+        self.assertEqual(compact(LTL._and(LTL.always(a, [0,3]), LTL.always(a, [4,9])), 6), LTL.always(a, [0,9]))
+
+        for exp in get_formulas():
+            I = IntegerSet.from_interval([0,45])
+            S = interval_simplification(exp, I, KnowledgeChecker())
+            S_compact, size_before, size_after = compact_mapping(S)
+            self.assertTrue(size_after <= size_before)
+            for t in range(0, 46):
+                self.assertEqual(S_compact.get_at_timestep(t), compact(S.get_at_timestep(t)))
+
+    def test_cost_model(self):
+        a = LTL.pred("a", [])
+        self.assertEqual(CostModel().features(LTL.always(LTL._and(a, LTL.next(a, 2)), [0,3])), (5, 2, 6, 16))
+
+        for exp in get_formulas():
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+
+                # a large threshold keeps every residual
+                S_cheap = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(cost_model=CostModel(threshold=1000)))
+                self.assertTrue(same_mapping(S, S_cheap, I), f"{exp} at {I}")
+
+                # a threshold of 0 only keeps the decided positions
+                S_orig = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(cost_model=CostModel(threshold=0)))
+                for t in range(0, 80):
+                    if I.contains(t) and S.get_at_timestep(t) not in [Wahr(), Falsch()]:
+                        self.assertEqual(S_orig.get_at_timestep(t), exp)
+
+    def test_interval_decision(self):
+        # interval_decision has to decide exactly the positions that interval_simplification reduces to true / false
+        formulas = get_formulas() + [LTL.until(LTL.pred("b", []), LTL.pred("a", []), (0,4))]
+        for exp in formulas:
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                I_true, I_false = interval_decision(exp, I, KnowledgeChecker())
+                for t in range(0, 80):
+                    if I.contains(t):
+                        self.assertEqual(I_true.contains(t), S.get_at_timestep(t) == Wahr(), f"{exp} at t={t}")
+                        self.assertEqual(I_false.contains(t), S.get_at_timestep(t) == Falsch(), f"{exp} at t={t}")
+
+    def test_narrow(self):
+        for exp in get_formulas() + [LTL._and(LTL.pred("a", []), LTL.pred("b", [])), LTL.implies(LTL.pred("c", []), LTL.pred("a", []))]:
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                S_narrow = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(narrow=True))
+                self.assertTrue(same_mapping(S, S_narrow, I), f"{exp} at {I}")
+
+        # "c" is false on [0,3], so "a" and "b" are never checked
+        pred_check = KnowledgeChecker()
+        checked = []
+        check_predicate = pred_check.check_predicate
+        pred_check.check_predicate = lambda name, terms, I=None: checked.append(name) or check_predicate(name, terms, I)
+        exp = LTL.conjunction([LTL.pred("c", []), LTL.pred("a", []), LTL.always(LTL.pred("b", []), [0,2])])
+        S = interval_simplification(exp, IntegerSet.from_interval([0,3]), pred_check, SimplificationOptions(narrow=True))
+        self.assertEqual(checked, ["c"])
+        self.assertTrue(S.get_I(Falsch()).equals(IntegerSet.from_interval([0,3])))
+
+    def test_statistics(self):
+        statistics = SimplificationStatistics()
+        options = SimplificationOptions(narrow=True, statistics=statistics)
+        for exp in get_formulas():
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                S_ordered = interval_simplification(exp, I, KnowledgeChecker(), options)
+                self.assertTrue(same_mapping(S, S_ordered, I), f"{exp} at {I}")
+
+        self.assertEqual(statistics.predicates["a"]["count"], statistics.subformulas[LTL.pred("a", [])]["count"])
+        statistics_copy = SimplificationStatistics.from_dict(statistics.to_dict())
+        self.assertEqual(statistics_copy.to_dict(), statistics.to_dict())
+
+        # subformulas simplified on a subtree executor are recorded like the ones simplified inline
+        exp = LTL._or(LTL.pred("a", []), LTL.always(LTL._and(LTL.ap("a"), LTL.pred("b", [])), [0,2]))
+        statistics = SimplificationStatistics()
+        interval_simplification(exp, IntegerSet.from_interval([0,45]), KnowledgeChecker(), SimplificationOptions(statistics=statistics))
+        statistics_parallel = SimplificationStatistics()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            options = SimplificationOptions(subtree_executor=executor, min_subtree_size=2, statistics=statistics_parallel)
+            interval_simplification(exp, IntegerSet.from_interval([0,45]), KnowledgeChecker(), options)
+        self.assertEqual(statistics_parallel.subformulas.keys(), statistics.subformulas.keys())
+        for key, rec in statistics.subformulas.items():
+            self.assertEqual(statistics_parallel.subformulas[key]["count"], rec["count"])
+            self.assertEqual(statistics_parallel.subformulas[key]["true"], rec["true"])
+        # the predicate a and the proposition a have records of their own
+        self.assertEqual(statistics.subformulas[LTL.pred("a", [])]["true"], 11)
+        self.assertEqual(statistics.subformulas[LTL.ap("a")]["true"], 0)
+
+        # equally expensive operands are ordered by the fraction of positions at which they decide the operator
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        statistics = SimplificationStatistics.from_dict({"predicates": {
+            "a": {"count": 1, "time": 1.0, "positions": 10, "true": 1, "false": 5},
+            "b": {"count": 1, "time": 1.0, "positions": 10, "true": 5, "false": 1},
+        }})
+        self.assertEqual(statistics.order([c, a, b], Falsch()), [1, 2, 0])
+        self.assertEqual(statistics.order([c, a, b], Wahr()), [2, 1, 0])
+
+    def test_lazy(self):
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        formulas = get_formulas() + [LTL.until(b, a, (0,4)), LTL.until(a, b, (0,None)), LTL.until(LTL._not(c), LTL._or(a, b), (2,6)),
+                                     LTL.always(LTL.until(a, c, (1,3)), [0,2]), LTL._and(LTL.until(b, c, (0,5)), LTL.eventually(a, [0,3]))]
+        traces = knowledge_traces(KnowledgeChecker(), 120, 30)
+        for exp in formulas:
+            S = interval_simplification(exp, IntegerSet.from_interval([0,45]), KnowledgeChecker())
+            lazy = LazySimplification(exp, KnowledgeChecker())
+            for t in [0, 7, 3, 33, 45, 8, 0]:
+                S_t = interval_simplification(exp, IntegerSet([t], False), KnowledgeChecker())
+                self.assertTrue(equivalent_at(lazy.get_at_timestep(t), S_t.get_at_timestep(t), t, traces), f"{exp} at t={t}")
+                self.assertTrue(equivalent_at(lazy.get_at_timestep(t), S.get_at_timestep(t), t, traces), f"{exp} at t={t}")
+                self.assertTrue(equivalent_at(lazy.get_at_timestep(t), exp, t, traces), f"{exp} at t={t}")
+
+            # only the queried positions of the root are computed
+            covered, _ = lazy.cache[exp]
+            self.assertTrue(covered.equals(IntegerSet([0, 3, 7, 8, 33, 45], False)))
+
+    def test_sparse_propagation(self):
+        I = IntegerSet([0, 1, 5000], False)
+        self.assertTrue(propagate_interval(I, TempUnOp("G", (2,4))).equals(IntegerSet([2, 3, 4, 5, 5002, 5003, 5004], False)))
+        I_l, I_r = propagate_interval(I, TempBinOp("U", (1,3)))
+        self.assertTrue(I_l.equals(IntegerSet([0, 1, 2, 3, 4, 5000, 5001, 5002, 5003], False)))
+        self.assertTrue(I_r.equals(IntegerSet([1, 2, 3, 4, 5001, 5002, 5003], False)))
+
+        for exp in get_formulas():
+            S = interval_simplification(exp, I, KnowledgeChecker())
+            for t in I:
+                self.assertEqual(S.get_at_timestep(t), interval_simplification(exp, IntegerSet([t], False), KnowledgeChecker()).get_at_timestep(t), f"{exp} at t={t}")
+
+    def test_formula_info(self):
+        X = Variable("X")
+        a = LTL.pred("a", [X])
+        b = LTL.pred("b", [])
+        exp = LTL.always(LTL._and(a, LTL.eventually(LTL.next(b, 2), [1,4])), [0,3])
+        info = exp.info()
+        self.assertEqual(info.horizon, 9)
+        self.assertEqual(info.depth, 3)
+        self.assertEqual(info.atoms, frozenset([a, b]))
+        self.assertEqual(info.variables, frozenset([X]))
+        self.assertFalse(info.past)
+        self.assertTrue(exp.contains_variable(X))
+        self.assertFalse(exp.contains_variable(Variable("Y")))
+        self.assertEqual(LTL.eventually(b).info().horizon, None)
+        self.assertTrue(LTL.previously(exp).info().past)
+
+    def test_fast_path(self):
+        options = SimplificationOptions(fast_path=True)
+        a, d, q = LTL.pred("a", []), LTL.pred("d", []), LTL.ap("q")
+        free = [
+            (LTL.always(LTL._or(d, LTL.next(q, 2)), [0,3]), IntegerSet.from_interval([0,45])),      # "d" is not registered
+            (LTL.eventually(LTL._and(a, q), [0,5]), IntegerSet.from_interval([40,60])),              # "a" is unknown after 30
+        ]
+        for exp, I in free:
+            S = interval_simplification(exp, I, KnowledgeChecker(), options)
+            self.assertEqual(S.expressions(), [exp])
+            self.assertTrue(S.get_I(exp).equals(I))
+            self.assertTrue(same_mapping(S, interval_simplification(exp, I, KnowledgeChecker()), I))
+
+        # knowledge inside the window and constants have to be simplified
+        for exp in get_formulas() + [LTL.eventually(LTL._and(a, q), [0,5]), LTL._or(d, Wahr())]:
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                self.assertTrue(same_mapping(S, interval_simplification(exp, I, KnowledgeChecker(), options), I), f"{exp} at {I}")
+
+    def test_past_operators(self):
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        S = interval_simplification(LTL.iff(a, b), IntegerSet.from_interval([0,45]), KnowledgeChecker())
+        self.assertEqual(S.get_at_timestep(7), Wahr())
+        self.assertEqual(S.get_at_timestep(2), b)
+        self.assertEqual(S.get_at_timestep(25), LTL._not(b))
+
+        S = interval_simplification(LTL.previously(b, 3), IntegerSet.from_interval([0,60]), KnowledgeChecker())
+        self.assertTrue(S.get_I(Falsch()).intersection(IntegerSet.from_interval([0,2])).equals(IntegerSet.from_interval([0,2])))
+        self.assertEqual(S.get_at_timestep(10), Wahr())
+        self.assertEqual(S.get_at_timestep(20), LTL.previously(b, 3))
+        self.assertEqual(S.get_at_timestep(50), Falsch())
+
+        S = interval_simplification(LTL.once(a, (2,5)), IntegerSet.from_interval([0,45]), KnowledgeChecker())
+        self.assertEqual(S.get_at_timestep(14), Wahr())
+        self.assertEqual(S.get_at_timestep(17), LTL.once(a, (2,5)))
+        self.assertEqual(S.get_at_timestep(27), Falsch())
+
+        # The window of an unbounded once reaches back to 0, on infinite sets the original formula is kept at the end
+        exp = LTL.once(c, (0,None))
+        S = interval_simplification(exp, IntegerSet.from_interval([3,45]), KnowledgeChecker())
+        self.assertEqual(S.get_at_timestep(3), Falsch())
+        self.assertEqual(S.get_at_timestep(5), LTL.once(c, (0,1)))
+        self.assertEqual(S.get_at_timestep(45), LTL.once(c, (0,41)))
+        self.assertEqual(interval_simplification(exp, IntegerSet([3], True), KnowledgeChecker()).get_at_timestep(100), exp)
+        self.assertEqual(interval_simplification(LTL.always(exp), IntegerSet([0], False), KnowledgeChecker()).get_at_timestep(0), Falsch())
+        self.assertEqual(interval_simplification(LTL.always(exp, [5,None]), IntegerSet([0], False), KnowledgeChecker()).get_at_timestep(0),
+                         LTL.always(exp, [5,None]))
+
+        formulas = [LTL.iff(a, LTL.next(b, 2)), LTL.previously(a, 4), LTL.once(LTL._or(a, b), (1,6)), LTL.always(LTL.once(b, (0,None)), [0,5])]
+        for exp in formulas:
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                I_true, I_false = interval_decision(exp, I, KnowledgeChecker())
+                for t in range(0, 80):
+                    if I.contains(t):
+                        self.assertEqual(I_true.contains(t), S.get_at_timestep(t) == Wahr(), f"{exp} at t={t}")
+                        self.assertEqual(I_false.contains(t), S.get_at_timestep(t) == Falsch(), f"{exp} at t={t}")
+
+    def test_normalize(self):
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        self.assertEqual(normalize(LTL.next(LTL.next(LTL.always(a, [0,4]), 3), 2)), LTL.always(a, [5,9]))
+        self.assertEqual(normalize(LTL.always(LTL.always(a, [1,2]), [0,3])), LTL.always(a, [1,5]))
+        self.assertEqual(normalize(LTL.eventually(LTL.next(LTL.eventually(a, [0,2])), [1,3])), LTL.eventually(a, [2,6]))
+        self.assertEqual(normalize(LTL._not(LTL.implies(a, LTL.always(b, [0,2])))), LTL._and(a, LTL.eventually(LTL._not(b), [0,2])))
+        self.assertEqual(normalize(LTL.conjunction([LTL._and(a, b), LTL.conjunction([c, LTL._not(LTL._not(a))])])), LTL.conjunction([a, b, c, a]))
+        self.assertEqual(normalize(LTL._not(LTL.once(a, (0,3)))), LTL._not(LTL.once(a, (0,3))))
+
+        # normalized formulas are decided at the same positions
+        for exp in get_formulas() + [LTL.next(LTL.always(LTL.eventually(LTL.eventually(b, [0,2]), [1,3]), [0,2]))]:
+            for I in get_position_sets():
+                I_true, I_false = interval_decision(exp, I, KnowledgeChecker())
+                I_true_norm, I_false_norm = interval_decision(normalize(exp), I, KnowledgeChecker())
+                self.assertTrue(I_true.equals(I_true_norm) and I_false.equals(I_false_norm), f"{exp} at {I}")
+
+    def test_normalize_finite(self):
+        a, b = LTL.pred("a", []), LTL.pred("b", [])
+        X_G = LTL.next(LTL.always(a, [0,2]))
+        trace = {"a": [True] * 7 + [False], "b": [False] * 8, "c": [False] * 8}
+        # X G is not G on a finite trace: X needs a next position
+        self.assertNotEqual(holds_finite(X_G, trace, 7), holds_finite(normalize(X_G), trace, 7))
+        self.assertEqual(normalize(X_G, 8), X_G)
+        self.assertEqual(normalize(LTL.next(LTL.next(a), 2), 8), LTL.next(a, 3))
+
+        formulas = [X_G, LTL.always(LTL.next(a), [0,3]), LTL._not(LTL.next(b, 2)), LTL.eventually(LTL.next(LTL.eventually(a, [0,2])), [1,3]),
+                    LTL._not(LTL.always(LTL.next(LTL._or(a, b)), [0,2])), LTL.always(LTL.always(a, [1,2]), [0,3]), LTL.next(LTL.next(LTL.eventually(b)))]
+        random.seed(3)
+        for _ in range(20):
+            trace = {name: [random.random() < 0.7 for _ in range(8)] for name in ["a", "b", "c"]}
+            for exp in formulas:
+                for t in range(8):
+                    self.assertEqual(holds_finite(exp, trace, t), holds_finite(normalize(exp, 8), trace, t), f"{exp} at t={t}")
+
+    def test_canonical(self):
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        self.assertEqual(canonicalize(LTL._and(b, a)), canonicalize(LTL._and(a, b)))
+        exp = canonicalize(LTL.disjunction([c, LTL.iff(b, a), c, LTL.iff(a, b)]))
+        self.assertEqual(exp, canonicalize(LTL.disjunction([LTL.iff(a, b), c])))
+        self.assertEqual(len(exp.expressions), 2)
+        self.assertEqual(canonicalize(LTL._or(a, a)), a)
+
+        # formulas with the same string are not merged
+        p_X, p_const_X = LTL.pred("p", [Variable("X")]), LTL.pred("p", [Constant("X")])
+        self.assertIsInstance(canonicalize(LTL._and(LTL.ap("a"), a)), BinaryExpression)
+        self.assertEqual(canonicalize(LTL.iff(p_X, p_const_X)), canonicalize(LTL.iff(p_const_X, p_X)))
+        self.assertNotEqual(canonicalize(LTL.iff(p_X, p_const_X)), Wahr())
+        self.assertIsInstance(canonicalize(LTL._or(LTL.pred("p", [Constant("x")]), LTL.ap("p_x"))), BinaryExpression)
+
+        # with an intern table equal subformulas are the same object
+        table = {}
+        exp_1 = canonicalize(LTL.always(LTL._and(b, a), [0,3]), table)
+        exp_2 = canonicalize(LTL.eventually(LTL._and(a, b)), table)
+        self.assertIs(exp_1.exp, exp_2.exp)
+
+        for exp in get_formulas():
+            for I in get_position_sets():
+                S = interval_simplification(exp, I, KnowledgeChecker())
+                S_canonical = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(canonical={}))
+                for t in range(0, 80):
+                    if I.contains(t):
+                        self.assertEqual(canonicalize(S.get_at_timestep(t)), canonicalize(S_canonical.get_at_timestep(t)), f"{exp} at t={t}")
+
+    def test_budget(self):
+        exp = LTL.always(LTL.implies(LTL.pred("a", []), LTL.eventually(LTL.pred("b", []), [0,5])), [0,4])
+        I = IntegerSet.from_interval([0,45])
+
+        # no budget used up
+        budget = Budget(seconds=60, max_size=1000)
+        S = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(budget=budget))
+        self.assertFalse(budget.exhausted)
+        self.assertTrue(same_mapping(S, interval_simplification(exp, I, KnowledgeChecker()), I))
+
+        # time budget used up before the first node
+        budget = Budget(seconds=0)
+        budget.expired()
+        time.sleep(0.01)
+        S = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(budget=budget))
+        self.assertTrue(budget.exhausted)
+        self.assertTrue(S.get_I(exp).equals(I))
+
+        # time budget used up inside the loop of a single slow Until node
+        pred_check = PredicateChecker()
+        pred_check.add_predicate("a", lambda input: (IntegerSet({t for t in range(60) if t % 4 != 3}, False), IntegerSet.empty()), 0)
+        pred_check.add_predicate("b", lambda input: (IntegerSet.empty(), IntegerSet({t for t in range(60) if t % 5 != 0}, False)), 0)
+        exp = LTL.until(LTL.pred("a", []), LTL.pred("b", []), (0,40))
+        I = IntegerSet.from_interval([0,30])
+        budget = Budget(seconds=0.05)
+        start = time.monotonic()
+        S = interval_simplification(exp, I, pred_check, SimplificationOptions(budget=budget))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertTrue(budget.exhausted)
+        self.assertTrue(IntegerSet.from_interval([20,30]).without(S.get_I(exp)).is_empty())
+        I_true, I_false = interval_decision(exp, I, pred_check)
+        self.assertTrue(S.get_I(Wahr()).equals(I_true) and S.get_I(Falsch()).equals(I_false))
+        self.assertTrue(all(S.get_at_timestep(t) != None for t in I))
+
+        # size budget: the decided positions are kept, all other positions are mapped to the original subformulas
+        for exp in get_formulas():
+            for I in get_position_sets():
+                budget = Budget(max_size=2)
+                S = interval_simplification(exp, I, KnowledgeChecker(), SimplificationOptions(budget=budget))
+                I_true, I_false = interval_decision(exp, I, KnowledgeChecker())
+                self.assertTrue(S.get_I(Wahr()).intersection(I).equals(I_true) and S.get_I(Falsch()).intersection(I).equals(I_false))
+                for residual in S.expressions():
+                    if residual != Wahr() and residual != Falsch() and not S.get_I(residual).intersection(I).is_empty():
+                        self.assertLessEqual(residual.size(), max(2, exp.size()), f"{exp}: {residual}")
+
+    def test_finite_trace(self):
+        a, b, c = LTL.pred("a", []), LTL.pred("b", []), LTL.pred("c", [])
+        N = 25
+        options = SimplificationOptions(trace_length=N)
+        formulas = get_formulas() + [LTL.until(b, a, (0,6)), LTL.always(LTL.eventually(c, [0,3])), LTL.next(a, 24), LTL.once(b, (2,None))]
+
+        # X is false and G is true after the end of the trace
+        S = interval_simplification(LTL.next(c, 2), IntegerSet.from_interval([0,45]), KnowledgeChecker(), options)
+        self.assertEqual(S.get_at_timestep(23), Falsch())
+        self.assertEqual(S.get_at_timestep(30), None)
+        S = interval_simplification(LTL.always(b, [0,10]), IntegerSet([0], True), KnowledgeChecker(), options)
+        self.assertEqual(S.get_at_timestep(24), LTL.always(b, [0,0]))
+        self.assertEqual(S.get_at_timestep(20), LTL.always(b, [0,4]))
+        self.assertEqual(S.get_at_timestep(14), LTL.always(b, [2,10]))
+
+        rng = random.Random(4)
+        checker = KnowledgeChecker()
+        for _ in range(3):
+            trace = {}
+            for name in ["a", "b", "c"]:
+                I_true, I_false = checker.check_predicate(name, [])
+                trace[name] = [I_true.contains(t) or (not I_false.contains(t) and rng.random() < 0.5) for t in range(N)]
+            for exp in formulas:
+                S = interval_simplification(exp, IntegerSet.from_interval([0,45]), checker, options)
+                S_lazy = LazySimplification(exp, checker, options).get_in(IntegerSet.from_interval([0,N-1]))
+                for t in range(N):
+                    self.assertEqual(holds_finite(exp, trace, t), holds_finite(S.get_at_timestep(t), trace, t), f"{exp} at t={t}")
+                    self.assertEqual(holds_finite(exp, trace, t), holds_finite(S_lazy.get_at_timestep(t), trace, t), f"{exp} at t={t}")
+
+    def test_finite_symbolic(self):
+        b, c = LTL.pred("b", []), LTL.pred("c", [])
+        N = 20
+        options = SimplificationOptions(trace_length=N, symbolic=True)
+        traces = knowledge_traces(KnowledgeChecker(), N, 10)
+        for exp in get_formulas() + [LTL._and(b, LTL.always(c, [0,5])), LTL.always(LTL.eventually(c, [1,3]), [0,2])]:
+            S = interval_simplification(exp, IntegerSet.from_interval([0,45]), KnowledgeChecker(), options)
+            for t in range(N):
+                self.assertTrue(equivalent_at(S.get_at_timestep(t), exp, t, traces), f"{exp} at t={t}")
+
+        # residual families whose windows reach past the end of the trace are clipped
+        S_r = BiDict()
+        S_r.add_exp_in(Wahr(), IntegerSet([3], False))
+        S_r.add_exp_in(b, IntegerSet([0,1,2], False).union(IntegerSet([4], True)))
+        S = clip_mapping(simplify_G(IntegerSet.from_interval([0,3]), S_r, 0, 10, True), 8)
+        self.assertTrue(all(isinstance(exp, Expression) for exp in S.expressions()))
+        self.assertEqual(S.get_at_timestep(0), LTL.conjunction([LTL.always(b, [0,2]), LTL.always(b, [4,7])]))
+        self.assertEqual(S.get_at_timestep(3), LTL.conjunction([LTL.always(b, [1,4])]))
+
+    def test_windowed_predicate(self):
+        requested = []
+        def eval_w(constants, I):
+            requested.append((constants, I))
+            return I.intersection(IntegerSet.from_interval([0,10])), I.intersection(IntegerSet.from_interval([20,30]))
+
+        pred_check = KnowledgeChecker()
+        pred_check.add_predicate("w", eval_w, 1, windowed=True)
+        w, a = LTL.pred("w", [Constant("V1")]), LTL.pred("a", [])
+
+        # only the positions read by G[0,3] are evaluated, a second query only asks for the missing ones
+        S = interval_simplification(LTL.always(w, [0,3]), IntegerSet.from_interval([0,5]), pred_check)
+        self.assertTrue(requested[0][1].equals(IntegerSet.from_interval([0,8])))
+        S_more = interval_simplification(LTL.always(w, [0,3]), IntegerSet.from_interval([0,10]), pred_check)
+        self.assertEqual(len(requested), 2)
+        self.assertEqual(requested[1][0], ["V1"])
+        self.assertTrue(requested[1][1].equals(IntegerSet.from_interval([9,13])))
+
+        # the same knowledge as the predicate "a" of the KnowledgeChecker
+        S_a = interval_simplification(LTL.always(a, [0,3]), IntegerSet.from_interval([0,10]), pred_check)
+        for t in range(0, 11):
+            self.assertEqual(S_more.get_at_timestep(t) == Wahr(), S_a.get_at_timestep(t) == Wahr())
+            self.assertEqual(S_more.get_at_timestep(t) == Falsch(), S_a.get_at_timestep(t) == Falsch())
+        self.assertEqual(S.get_at_timestep(5), Wahr())
+
+    def test_bulk_predicate(self):
+        calls = []
+        def eval_near(constant_lists):
+            # true in [0,9] for V1 and in [5,9] for all other vehicles, false in [10,19] (one column per position)
+            calls.append(constant_lists)
+            rows_true = [[t < 10 and (c[0] == "V1" or t >= 5) for t in range(20)] for c in constant_lists]
+            rows_false = [[t >= 10 for t in range(20)] for c in constant_lists]
+            return rows_true, rows_false
+
+        pred_check = KnowledgeChecker()
+        pred_check.add_bulk_predicate("near", eval_near, 1)
+        near = [LTL.pred("near", [Constant(f"V{i}")]) for i in range(1, 6)]
+        exp = LTL.conjunction([LTL.always(near[0], [0,3]), LTL.eventually(LTL.disjunction(near[1:]), [0,2]), LTL.pred("a", [])])
+
+        pred_check.prefetch(exp)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(calls[0]), [["V1"], ["V2"], ["V3"], ["V4"], ["V5"]])
+        # looking up the missing atoms is not a use of the cache
+        stats = pred_check.cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"]), (6, 0, 0))
+        pred_check.prefetch(exp)
+        self.assertEqual(pred_check.cache.stats()["hits"], 0)
+
+        S = interval_simplification(exp, IntegerSet.from_interval([0,12]), pred_check)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(pred_check.cache.stats()["misses"], 0)
+        self.assertEqual(S.get_at_timestep(3), Wahr())
+        I_true, I_false = pred_check.check_predicate("near", [Constant("V2")])
+        self.assertTrue(I_true.equals(IntegerSet.from_interval([5,9])) and I_false.equals(IntegerSet.from_interval([10,19])))
+
+        # atoms that are not cached yet are evaluated with a single call as well
+        pred_check.check_predicate("near", [Constant("V9")])
+        self.assertEqual(calls[-1], [["V9"]])
+
+    def test_async_prefetch(self):
+        active = [0, 0]         # currently running, maximum
+        async def eval_close(constants):
+            active[0] += 1
+            active[1] = max(active)
+            await asyncio.sleep(0.05)
+            active[0] -= 1
+            return IntegerSet.from_interval([0,10]) if constants == ["V1"] else IntegerSet.empty(), IntegerSet([11], True)
+
+        pred_check = AsyncPredicateChecker(max_concurrency=3)
+        pred_check.add_async_predicate("close", eval_close, 1)
+        pred_check.add_predicate("a", KnowledgeChecker.interval_a, 0)
+        close = [LTL.pred("close", [Constant(f"V{i}")]) for i in range(1, 8)]
+        exp = LTL._and(LTL.always(LTL.disjunction(close), [0,3]), LTL.pred("a", []))
+
+        pred_check.prefetch(exp)
+        self.assertEqual(active[1], 3)
+        self.assertEqual(len(pred_check.missing_atoms(exp)), 0)
+        S = interval_simplification(exp, IntegerSet.from_interval([0,12]), pred_check)
+        self.assertEqual(S.get_at_timestep(7), Wahr())
+        self.assertEqual(S.get_at_timestep(12), Falsch())
+
+        # atoms that were not prefetched are evaluated when they are checked
+        I_true, I_false = pred_check.check_predicate("close", [Constant("V9")])
+        self.assertTrue(I_true.is_empty() and I_false.equals(IntegerSet([11], True)))
+
+    def test_predicate_cache(self):
+        calls = []
+        def eval_near(constants):
+            calls.append(constants)
+            return IntegerSet.from_interval([0,5]), IntegerSet([6], True)
+
+        pred_check = PredicateChecker(PredicateCache(max_entries=2))
+        pred_check.add_predicate("near", eval_near, 1)
+        V1, V2, V3 = Constant("V1"), Constant("V2"), Constant("V3")
+
+        for vehicle in [V1, V2, V1, V3, V1, V2]:
+            I_true, _ = pred_check.check_predicate("near", [vehicle])
+            self.assertTrue(I_true.equals(IntegerSet.from_interval([0,5])))
+        # V1 is used most recently, so V2 is evicted for V3 and evaluated again
+        self.assertEqual(calls, [["V1"], ["V2"], ["V3"], ["V2"]])
+        stats = pred_check.cache.stats()
+        self.assertEqual((stats["entries"], stats["hits"], stats["misses"], stats["evictions"]), (2, 2, 4, 2))
+
+        # entries of a scenario are invalidated together
+        pred_check.scenario = "s2"
+        pred_check.check_predicate("near", [V3])
+        pred_check.invalidate(scenario="s2")
+        self.assertEqual(len(pred_check.cache), 1)
+
+        # a windowed atom that is known at every position is returned directly, but stays an entry of the bounded cache
+        requested = []
+        def eval_w(constants, I):
+            requested.append(I)
+            return I.intersection(IntegerSet.from_interval([0,5])), I.intersection(IntegerSet([6], True))
+
+        pred_check = PredicateChecker(PredicateCache(max_entries=1))
+        pred_check.add_predicate("w", eval_w, 1, windowed=True)
+        pred_check.check_predicate("w", [V1])
+        self.assertTrue(pred_check.cached("w", ["V1"])[0].equals(IntegerSet.from_interval([0,5])))
+        self.assertEqual(len(pred_check.cached("w", ["V1"])), 2)
+        hits = pred_check.cache.hits
+        I_true, I_false = pred_check.check_predicate("w", [V1], IntegerSet.from_interval([3,9]))
+        self.assertTrue(I_true.equals(IntegerSet.from_interval([0,5])) and I_false.equals(IntegerSet([6], True)))
+        self.assertEqual((len(requested), pred_check.cache.hits), (1, hits + 1))
+        pred_check.check_predicate("w", [V2])
+        pred_check.check_predicate("w", [V1], IntegerSet.from_interval([3,9]))
+        self.assertEqual(len(requested), 3)
+        self.assertTrue(requested[2].equals(IntegerSet.from_interval([3,9])))
+
+        # expired entries are evaluated again
+        cache = PredicateCache(ttl=0.01)
+        cache.put(("near", ("V1",)), (IntegerSet.empty(), IntegerSet.empty()))
+        self.assertIsNotNone(cache.get(("near", ("V1",))))
+        time.sleep(0.02)
+        self.assertIsNone(cache.get(("near", ("V1",))))
+
+    def test_shared_checker(self):
+        calls = []
+        def eval_near(constants):
+            calls.append(constants)
+            time.sleep(0.05)
+            return IntegerSet.from_interval([0,10]) if constants == ["V1"] else IntegerSet.empty(), IntegerSet([11], True)
+
+        pred_check = KnowledgeChecker()
+        pred_check.add_predicate("near", eval_near, 1)
+        near = [LTL.pred("near", [Constant(f"V{i}")]) for i in range(1, 4)]
+        exp = LTL._and(LTL.always(LTL.disjunction(near), [0,3]), LTL.pred("a", []))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(interval_simplification, exp, IntegerSet.from_interval([0,12]), pred_check) for _ in range(8)]
+            futures += [executor.submit(pred_check.prefetch, exp) for _ in range(4)]
+            results = [future.result() for future in futures[:8]]
+
+        # every atom is evaluated once although all threads need it at the same time
+        self.assertEqual(sorted(calls), [["V1"], ["V2"], ["V3"]])
+        for S in results:
+            self.assertEqual(S.get_at_timestep(7), Wahr())
+            self.assertEqual(S.get_at_timestep(12), Falsch())
+        self.assertEqual(len(pred_check.pending), 0)
+
+    def test_chunked_processes(self):
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            options = SimplificationOptions(executor=executor, chunk_size=8)
+            exp = LTL.always(LTL.implies(LTL.pred("a", []), LTL.eventually(LTL.pred("b", []), [0,5])), [0,4])
+            I = IntegerSet.from_interval([0,45])
+            S = interval_simplification(exp, I, KnowledgeChecker())
+            S_chunked = interval_simplification(exp, I, KnowledgeChecker(), options)
+            self.assertTrue(same_mapping(S, S_chunked, I))
+
+    def test_chunked_workers(self):
+        # case 1 & 2 are decided before chunking, the workers only get undecided positions and the part of S_r they read
+        class RecordingExecutor(ThreadPoolExecutor):
+            def __init__(self):
+                super().__init__(max_workers=2)
+                self.calls = []
+            def submit(self, fn, *args):
+                self.calls.append((fn, args))
+                return super().submit(fn, *args)
+
+        exp = LTL.always(LTL.pred("b", []), [0,4])
+        I = IntegerSet.from_interval([0,60])
+        I_true, I_false = interval_decision(exp, I, KnowledgeChecker())
+        with RecordingExecutor() as executor:
+            options = SimplificationOptions(executor=executor, chunk_size=4)
+            S_chunked = interval_simplification(exp, I, KnowledgeChecker(), options)
+        self.assertTrue(same_mapping(interval_simplification(exp, I, KnowledgeChecker()), S_chunked, I))
+
+        workers = [args for fn, args in executor.calls if fn.__name__ == "simplify_undecided"]
+        self.assertTrue(len(workers) > 1)
+        for op_type, chunk, S_r, S_l, worker_options, _ in workers:
+            self.assertTrue(chunk.intersection(I_true.union(I_false)).is_empty())
+            for I_exp in S_r.intervals():
+                self.assertTrue(I_exp.is_inf() or I_exp.max() <= chunk.max() + 4)
+            self.assertEqual(worker_options.executor, None)
+
+
+if "__main__" == __name__:
+    unittest.main()
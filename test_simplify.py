@@ -123,7 +123,56 @@ class TestSimplifyToBool(unittest.TestCase):
                 I_true, I_false = interval_U(I_true_l, I_false_l, I_true_r, I_false_r, (a,b))
 
             self.assertTrue(check_true and check_false)
-                
+
+
+    def test_P(self):
+        for _ in range(999):
+            # 1. Create random sets and a random interval
+            I_true_r = get_random_set()
+            I_false_r = get_random_set()
+            (a,b) = get_random_interval()
+
+            # 2. Apply the function
+            I_true, I_false = interval_P(I_true_r, I_false_r, (a,b))
+
+            # 3. Compare with deterministic computation to determine pass/fail
+            check = check_P(I_true_r, I_false_r, (a,b), I_true, I_false)
+
+            if not check:
+                print(f"I_true_r  : {I_true_r}")
+                print(f"I_false_r : {I_false_r}")
+                print(f"a: {a}, b: {b}")
+                print(f"I_true    : {I_true}")
+                print(f"I_false   : {I_false}")
+                print("------------")
+
+            self.assertTrue(check)
+
+
+    def test_O(self):
+        for _ in range(999):
+            # 1. Create random sets and a random interval
+            I_true_r = get_random_set()
+            I_false_r = get_random_set()
+            (a,b) = get_random_interval()
+
+            # 2. Apply the function
+            I_true, I_false = interval_O(I_true_r, I_false_r, (a,b))
+
+            # 3. Compare with deterministic computation to determine pass/fail
+            check = check_O(I_true_r, I_false_r, (a,b), I_true, I_false)
+
+            if not check:
+                print(f"I_true_r  : {I_true_r}")
+                print(f"I_false_r : {I_false_r}")
+                print(f"a: {a}, b: {b}")
+                print(f"I_true    : {I_true}")
+                print(f"I_false   : {I_false}")
+                print("------------")
+
+            self.assertTrue(check)
+
+            
 
 
 def check_G(I_true_r, I_false_r, I, I_true, I_false):
@@ -366,6 +415,60 @@ def check_U_false(I_false_l, I_false_r, I, I_false):
         
     return res_I_false == I_false
 
+def check_P(I_true_r, I_false_r, I, I_true, I_false):
+    I_true_r = I_true_r.get_deterministic()
+    I_false_r = I_false_r.get_deterministic()
+    I_true = I_true.get_deterministic()
+    I_false = I_false.get_deterministic()
+
+    a = I[0]
+
+    # P[a] phi looks back a states and is false if there is no such state
+    res_I_true = set([i for i in range(0,200) if i-a >= 0 and i-a in I_true_r])
+    res_I_false = set([i for i in range(0,200) if i-a < 0 or i-a in I_false_r])
+
+    if res_I_false != I_false:
+        print("failed P for I_false:")
+        print(res_I_false)
+
+    if res_I_true != I_true:
+        print("failed P for I_true:")
+        print(res_I_true)
+
+    return res_I_false == I_false and res_I_true == I_true
+
+def check_O(I_true_r, I_false_r, I, I_true, I_false):
+    I_true_r = I_true_r.get_deterministic()
+    I_false_r = I_false_r.get_deterministic()
+    I_true = I_true.get_deterministic()
+    I_false = I_false.get_deterministic()
+
+    a = I[0]
+    b = I[1]
+
+    res_I_true = []
+    res_I_false = []
+    for i in range(0,200):
+        # states i-n for n in [a,b] that exist
+        past = [i-n for n in range(a, i+1 if b == None else min(b, i)+1)]
+        if any(j in I_true_r for j in past):
+            res_I_true.append(i)
+        if all(j in I_false_r for j in past):
+            res_I_false.append(i)
+
+    res_I_true = set(res_I_true)
+    res_I_false = set(res_I_false)
+
+    if res_I_false != I_false:
+        print("failed O for I_false:")
+        print(res_I_false)
+
+    if res_I_true != I_true:
+        print("failed O for I_true:")
+        print(res_I_true)
+
+    return res_I_false == I_false and res_I_true == I_true
+
 def get_random_set():
 
     l = random.randint(0,60)
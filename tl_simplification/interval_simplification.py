@@ -1,3 +1,7 @@
+import time
+from dataclasses import replace
+from typing import List
+
 from tl_simplification.simplification.predicate_checker import PredicateChecker
 from tl_simplification.ltl import *
 from tl_simplification.utils.int_set import IntegerSet, BiDict
@@ -5,18 +9,38 @@ from tl_simplification.utils.int_set import IntegerSet, BiDict
 # Import subfunctions of the IntervalSimplification algorithm
 from tl_simplification.simplification.propagate_interval import propagate_interval
 from tl_simplification.simplification.simplify import simplify, simplify_multi
+from tl_simplification.simplification.parallel import simplify_chunked
+from tl_simplification.simplification.options import SimplificationOptions
+from tl_simplification.simplification.statistics import SimplificationStatistics
+from tl_simplification.simplification.cost import keep_cheaper
+from tl_simplification.simplification.canonical import canonical_mapping
+from tl_simplification.simplification.finite import clip, clip_mapping, end_values, pad
+from tl_simplification.simplification.interval_functions import *
 
     
-def interval_simplification(exp : Expression, I : IntegerSet, pred_check : PredicateChecker):
+def interval_simplification(exp : Expression, I : IntegerSet, pred_check : PredicateChecker, options : SimplificationOptions = None):
         
         """
         IntervalSimplification algorithm as explained in my thesis. The knowledge map P is replaced by the PredicateChecker.
         @Params:
-        - exp : Expression              : expression to be simplified
-        - I : IntegerSet                : a set of trace positions at which the formula should be simplified
-        - pred_check : PredicateChecker : Instance of a class that inherits from PredicateChecker
+        - exp : Expression                  : expression to be simplified
+        - I : IntegerSet                    : a set of trace positions at which the formula should be simplified
+        - pred_check : PredicateChecker     : Instance of a class that inherits from PredicateChecker
+        - options : SimplificationOptions   : optional settings, see options.py
         
         """
+        if options == None:
+            options = SimplificationOptions()
+        I = clip(I, options.trace_length)
+
+        if out_of_budget(exp, options):
+            return options.budget.truncate(exp, I)
+
+        if options.fast_path and isinstance(exp, (UnaryExpression, BinaryExpression, MultiExpression)) and knowledge_free(exp, I, pred_check):
+            # Nothing to simplify in this subtree, it is its own residual at every position
+            S = BiDict()
+            S.add_exp_in(exp, I)
+            return S
 
         match exp:
             case AtomicProposition(ap):
@@ -27,7 +51,7 @@ def interval_simplification(exp : Expression, I : IntegerSet, pred_check : Predi
 
             case Predicate(name, terms):
                 # A "predicate_check" is performed which is analog to using the knowledge map P in my thesis 
-                I_true, I_false = pred_check.check_predicate(name, terms)
+                I_true, I_false = pred_check.check_predicate(name, terms, I)
                 S = BiDict()
                 S.add_exp_in(Wahr(), I_true.intersection(I))
                 S.add_exp_in(Falsch() ,I_false.intersection(I))
@@ -44,40 +68,247 @@ def interval_simplification(exp : Expression, I : IntegerSet, pred_check : Predi
                 S.add_exp_in(Falsch(),IntegerSet.n0().intersection(I))
                 return S
             
-            case UnaryExpression(op_type, exp):
+            case UnaryExpression(op_type, exp_r):
                 # PropagateInterval
                 I_r = propagate_interval(I, op_type)
 
                 # IntervalSimplification
-                S_r = interval_simplification(exp, I_r, pred_check)
+                S_r = interval_simplification(exp_r, I_r, pred_check, options)
+                S_r = pad(S_r, end_values(op_type)[1], options.trace_length)
 
                 # Simplify
-                S = simplify(op_type, I, S_r)
+                if out_of_budget(exp, options):
+                    return options.budget.truncate(exp, I)
+                if isinstance(op_type, TempUnOp):
+                    S = simplify_chunked(op_type, I, S_r, None, options, exp)
+                else:
+                    S = simplify(op_type, I, S_r, None, options, exp)
                 
-                return S
+                return finish(exp, I, S, options)
 
             case BinaryExpression(op_type, exp_l, exp_r):
                 # PropagateInterval
                 I_l, I_r = propagate_interval(I, op_type)
 
                 # IntervalSimplification
-                S_l = interval_simplification(exp_l, I_l, pred_check)
-                S_r = interval_simplification(exp_r, I_r, pred_check)
+                S_l, S_r = simplify_siblings([exp_l, exp_r], [I_l, I_r], pred_check, options, op_type)
+                end_l, end_r = end_values(op_type)
+                S_l, S_r = pad(S_l, end_l, options.trace_length), pad(S_r, end_r, options.trace_length)
 
                 # Simplify
-                S = simplify(op_type, I, S_r, S_l)
-                return S
+                if out_of_budget(exp, options):
+                    return options.budget.truncate(exp, I)
+                if isinstance(op_type, TempBinOp):
+                    S = simplify_chunked(op_type, I, S_r, S_l, options)
+                else:
+                    S = simplify(op_type, I, S_r, S_l, options)
+                return finish(exp, I, S, options)
 
             case MultiExpression(op_type, expressions):
                 # PropagateInterval
                 I_sub = propagate_interval(I, op_type)
 
                 # IntervalSimplification
-                S_sub = [interval_simplification(exp_sub, I_sub, pred_check) for exp_sub in expressions]
+                S_sub = simplify_siblings(expressions, [I_sub for _ in expressions], pred_check, options, op_type)
 
                 # Simplify
-                S = simplify_multi(op_type, I_sub, S_sub)
+                if out_of_budget(exp, options):
+                    return options.budget.truncate(exp, I)
+                S = simplify_multi(op_type, I_sub, S_sub, options.budget)
+
+                return finish(exp, I, S, options)
+
+
+def out_of_budget(exp : Expression, options : SimplificationOptions) -> bool:
+        # Checks if the time budget is used up. Propositions, predicates, true and false are always evaluated
+        return options.budget != None and isinstance(exp, (UnaryExpression, BinaryExpression, MultiExpression)) and options.budget.expired()
+
+
+def finish(exp : Expression, I : IntegerSet, S : BiDict, options : SimplificationOptions) -> BiDict:
+        # Applies the budgets, the cost model and the canonical form to the simplification mapping S of exp at I
+        if out_of_budget(exp, options):
+            S = options.budget.fill(exp, I, S)
+        S = keep_cheaper(exp, clip_mapping(S, options.trace_length), options.cost_model)
+        if options.budget != None:
+            S = options.budget.limit(exp, S)
+        return canonical_mapping(S, options.canonical)
+
+
+def interval_decision(exp : Expression, I : IntegerSet, pred_check : PredicateChecker) -> Tuple[IntegerSet, IntegerSet]:
+        """
+        Decision only variant of the IntervalSimplification algorithm. Returns the sets of trace positions in I at which exp
+        can be reduced to true (I_true) and to false (I_false). Only the first two cases of the Simplify functions are
+        evaluated with the functions from interval_functions.py, no residual formulas are built.
+        Operators without an interval function decide no trace position.
+        """
+        I_true, I_false = IntegerSet.empty(), IntegerSet.empty()
+        if knowledge_free(exp, I, pred_check):
+            return I_true, I_false
+
+        match exp:
+            case Predicate(name, terms):
+                I_true, I_false = pred_check.check_predicate(name, terms, I)
+
+            case Wahr():
+                I_true = IntegerSet.n0()
+
+            case Falsch():
+                I_false = IntegerSet.n0()
+
+            case UnaryExpression(op_type, exp_r):
+                I_true_r, I_false_r = interval_decision(exp_r, propagate_interval(I, op_type), pred_check)
+                match op_type:
+                    case TempUnOp("G", (a,b)):
+                        I_true, I_false = interval_G(I_true_r, I_false_r, (a,b))
+                    case TempUnOp("F", (a,b)):
+                        I_true, I_false = interval_F(I_true_r, I_false_r, (a,b))
+                    case TempUnOp("X", (a,_)):
+                        I_true, I_false = interval_X(I_true_r, I_false_r, (a,None))
+                    case TempUnOp("P", (a,_)):
+                        I_true, I_false = interval_P(I_true_r, I_false_r, (a,None))
+                    case TempUnOp("O", (a,b)):
+                        I_true, I_false = interval_O(I_true_r, I_false_r, (a,b))
+                    case LogicUnOp("not"):
+                        I_true, I_false = interval_Not(I_true_r, I_false_r)
+
+            case BinaryExpression(op_type, exp_l, exp_r):
+                I_l, I_r = propagate_interval(I, op_type)
+                I_true_l, I_false_l = interval_decision(exp_l, I_l, pred_check)
+                I_true_r, I_false_r = interval_decision(exp_r, I_r, pred_check)
+                match op_type:
+                    case TempBinOp("U", (a,b)):
+                        I_true, I_false = interval_U(I_true_l, I_false_l, I_true_r, I_false_r, (a,b))
+                    case LogicBinOp("and"):
+                        I_true, I_false = interval_And(I_true_l, I_false_l, I_true_r, I_false_r)
+                    case LogicBinOp("or"):
+                        I_true, I_false = interval_Or(I_true_l, I_false_l, I_true_r, I_false_r)
+                    case LogicBinOp("imp"):
+                        I_true, I_false = interval_Imp(I_true_l, I_false_l, I_true_r, I_false_r)
+                    case LogicBinOp("iff"):
+                        I_true, I_false = interval_Iff(I_true_l, I_false_l, I_true_r, I_false_r)
+
+            case MultiExpression(LogicMultiOp(op), expressions):
+                I_sub = propagate_interval(I, exp.operator)
+                interval_op = interval_And if op == "conjunction" else interval_Or
+                I_true, I_false = interval_decision(expressions[0], I_sub, pred_check)
+                for sub in expressions[1:]:
+                    I_true_i, I_false_i = interval_decision(sub, I_sub, pred_check)
+                    I_true, I_false = interval_op(I_true_i, I_false_i, I_true, I_false)
+
+        return I_true.intersection(I), I_false.intersection(I)
+
+
+def knowledge_free(exp : Expression, I : IntegerSet, pred_check : PredicateChecker) -> bool:
+        """
+        Checks if exp can not be simplified at any position of I: it contains neither true nor false and none of its predicates
+        is known to be true or false in the window of trace positions that exp reads when evaluated at I (see FormulaInfo).
+        This includes atomic propositions and predicates that are not registered at the PredicateChecker.
+        """
+        info = exp.info()
+        if info.constants or I.is_empty():
+            return False
+
+        start = 0 if info.past else I.min()
+        end = None if (I.is_inf() or info.horizon == None) else I.max() + info.horizon
+        window = IntegerSet.from_interval((start, end))
+        for atom in info.atoms:
+            if isinstance(atom, Predicate):
+                I_true, I_false = pred_check.check_predicate(atom.name, atom.terms, window)
+                if not I_true.union(I_false).intersection(window).is_empty():
+                    return False
+        return True
+
+
+def simplify_siblings(expressions : List[Expression], intervals : List[IntegerSet], pred_check : PredicateChecker, options : SimplificationOptions, op_type = None):
+        """
+        Runs IntervalSimplification for each expression at the corresponding set of trace positions.
+        The subformulas are independent of each other. If options.subtree_executor is set, subformulas with at least
+        options.min_subtree_size nodes are simplified on the executor while the smaller ones are simplified inline.
+        Otherwise, if options.narrow is set, the siblings of a logical operator are simplified one after another (see narrow_siblings).
+        """
+        executor = options.subtree_executor
+        if executor == None:
+            if options.narrow and isinstance(op_type, (LogicBinOp, LogicMultiOp)):
+                return narrow_siblings(expressions, intervals, pred_check, options, op_type)
+            return [simplify_recorded(exp, I, pred_check, options) for exp, I in zip(expressions, intervals)]
+
+        # Workers simplify their subformula serially
+        worker_options = replace(options, executor=None, subtree_executor=None)
+
+        futures = {}
+        for i, (exp, I) in enumerate(zip(expressions, intervals)):
+            if exp.size() >= options.min_subtree_size:
+                futures[i] = executor.submit(simplify_subtree, exp, I, pred_check, worker_options)
+
+        results = []
+        for i, (exp, I) in enumerate(zip(expressions, intervals)):
+            if i in futures:
+                results.append(None)
+            else:
+                results.append(simplify_recorded(exp, I, pred_check, options))
+
+        for i, future in futures.items():
+            results[i], statistics = future.result()
+            if statistics != None:
+                options.statistics.merge(statistics)
+
+        return results
+
+
+def simplify_subtree(exp : Expression, I : IntegerSet, pred_check : PredicateChecker, options : SimplificationOptions):
+        """
+        Runs simplify_recorded on a worker of options.subtree_executor. The worker records into statistics of its own, as
+        the statistics of the caller are not shared with other processes and are not thread safe. Returns the mapping and
+        these statistics (None without options.statistics), which the caller merges.
+        """
+        if options.statistics != None:
+            options = replace(options, statistics=SimplificationStatistics())
+        return simplify_recorded(exp, I, pred_check, options), options.statistics
+
+
+def narrow_siblings(expressions : List[Expression], intervals : List[IntegerSet], pred_check : PredicateChecker, options : SimplificationOptions, op_type):
+        """
+        Simplifies the operands of a logical operator from left to right. Trace positions at which the operator is already
+        decided by the previous operands are removed from the positions of the following ones:
+        - and / conjunction : positions where an operand is false
+        - or / disjunction  : positions where an operand is true
+        - imp               : positions where the left operand is false
+        Once every position is decided, the remaining operands are not simplified at all (their mappings stay empty).
+        If options.statistics is set, the operands of and, or, conjunctions and disjunctions are simplified in the order
+        given by the statistics. The mappings are returned in the order of expressions.
+        """
+        order = list(range(len(expressions)))
+        match op_type:
+            case LogicBinOp("and") | LogicMultiOp("conjunction"):
+                forcing = Falsch()
+            case LogicBinOp("or") | LogicMultiOp("disjunction"):
+                forcing = Wahr()
+            case LogicBinOp("imp"):
+                forcing = Falsch()
+            case _:
+                return [simplify_recorded(exp, I, pred_check, options) for exp, I in zip(expressions, intervals)]
+
+        if options.statistics != None and op_type != LogicBinOp("imp"):
+            order = options.statistics.order(expressions, forcing)
+
+        decided = IntegerSet.empty()
+        results = [BiDict() for _ in expressions]
+        for i in order:
+            I = intervals[i].without(decided)
+            if I.is_empty():
+                continue
+            S = simplify_recorded(expressions[i], I, pred_check, options)
+            decided = decided.union(S.get_I(forcing))
+            results[i] = S
+        return results
 
-                return S
 
+def simplify_recorded(exp : Expression, I : IntegerSet, pred_check : PredicateChecker, options : SimplificationOptions) -> BiDict:
+        # Runs IntervalSimplification and adds the evaluation to options.statistics if it is set
+        if options.statistics == None:
+            return interval_simplification(exp, I, pred_check, options)
 
+        start = time.perf_counter()
+        S = interval_simplification(exp, I, pred_check, options)
+        options.statistics.record(exp, time.perf_counter() - start, S, I)
+        return S
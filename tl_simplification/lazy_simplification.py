@@ -0,0 +1,89 @@
+from tl_simplification.simplification.predicate_checker import PredicateChecker
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+from tl_simplification.simplification.propagate_interval import propagate_interval
+from tl_simplification.simplification.simplify import simplify, simplify_multi
+from tl_simplification.simplification.options import SimplificationOptions
+from tl_simplification.simplification.finite import clip, end_values, pad
+from tl_simplification.interval_simplification import interval_simplification, knowledge_free, finish, out_of_budget
+
+"""
+Demand driven variant of the IntervalSimplification algorithm.
+
+interval_simplification computes the whole simplification mapping for a set of trace positions I, and every temporal
+operator widens I for its subformula. Most callers however only ask for a few trace positions, e.g. get_at_timestep(0).
+LazySimplification computes the mapping of a node only for the positions that are asked for and only asks its
+subformulas for the positions these answers depend on. The mappings of all nodes are cached, so later queries only
+compute the positions that are missing.
+"""
+
+
+class LazySimplification:
+
+    """
+    - exp : Expression                  : expression to be simplified
+    - pred_check : PredicateChecker     : Instance of a class that inherits from PredicateChecker
+    - options : SimplificationOptions   : optional settings, see options.py. The executors are not used here.
+    The cache maps every subformula to the set of trace positions that have been computed and its (partial) mapping.
+    """
+
+    def __init__(self, exp : Expression, pred_check : PredicateChecker, options : SimplificationOptions = None):
+        self.exp = exp
+        self.pred_check = pred_check
+        self.options = SimplificationOptions() if options == None else options
+        self.cache = {}
+
+    def get_at_timestep(self, timestep : int) -> Expression:
+        return self.ensure(self.exp, IntegerSet([timestep], False)).get_at_timestep(timestep)
+
+    def get_in(self, I : IntegerSet) -> BiDict:
+        # Returns the simplification mapping of exp restricted to I
+        return self.ensure(self.exp, I).restrict(I)
+
+    def ensure(self, exp : Expression, I : IntegerSet) -> BiDict:
+        # Makes sure that the cached mapping of exp contains all positions of I and returns it
+        covered, S = self.cache.get(exp, (IntegerSet.empty(), BiDict()))
+        missing = I.without(covered)
+        if missing.is_empty():
+            return S
+
+        S_missing = self.compute(exp, missing).restrict(missing)
+        for exp_missing in S_missing.expressions():
+            S.add_exp_in(exp_missing, S_missing.get_I(exp_missing))
+        self.cache[exp] = (covered.union(missing), S)
+        return S
+
+    def compute(self, exp : Expression, I : IntegerSet) -> BiDict:
+        options = self.options
+        I = clip(I, options.trace_length)
+        if out_of_budget(exp, options):
+            return options.budget.truncate(exp, I)
+
+        if options.fast_path and knowledge_free(exp, I, self.pred_check):
+            S = BiDict()
+            S.add_exp_in(exp, I)
+            return S
+
+        match exp:
+            case UnaryExpression(op_type, exp_r):
+                S_r = self.ensure(exp_r, propagate_interval(I, op_type))
+                S_r = pad(S_r, end_values(op_type)[1], options.trace_length)
+                S = simplify(op_type, I, S_r, None, options, exp)
+
+            case BinaryExpression(op_type, exp_l, exp_r):
+                I_l, I_r = propagate_interval(I, op_type)
+                end_l, end_r = end_values(op_type)
+                S_l = pad(self.ensure(exp_l, I_l), end_l, options.trace_length)
+                S_r = pad(self.ensure(exp_r, I_r), end_r, options.trace_length)
+                S = simplify(op_type, I, S_r, S_l, options)
+
+            case MultiExpression(op_type, expressions):
+                I_sub = propagate_interval(I, op_type)
+                S = simplify_multi(op_type, I_sub, [self.ensure(sub, I_sub) for sub in expressions], options.budget)
+
+            case _:
+                # Propositions, predicates, true and false
+                return interval_simplification(exp, I, self.pred_check, options)
+
+        return finish(exp, I, S, options)
@@ -106,7 +106,8 @@ class TempUnOp():
                 case _:
                     self.interval = (0,None)
         else:
-            self.interval = interval
+            # Intervals are stored as tuples, such that operators built from lists and tuples are equal
+            self.interval = tuple(interval)
                 
     def __hash__(self):
         return hash(self.name)+ hash(tuple(self.interval))
@@ -235,27 +236,110 @@ class Expression:
                 raise ValueError("This Expression is not known")
 
     def contains_variable(self, variable : 'Variable'):
+        return variable in self.info().variables
+
+    def contains_variable_by_name(self, var_name:str):
+        return self.contains_variable(Variable(var_name))
+
+    def size(self) -> int:
+        """
+        Returns the number of nodes in the syntax tree of the expression
+        """
         match self:
-            case BinaryExpression(operator, exp1, exp2): 
-                return exp1.contains_variable(variable) or exp2.contains_variable(variable)
-            
+            case BinaryExpression(operator, exp1, exp2):
+                return 1 + exp1.size() + exp2.size()
             case UnaryExpression(operator, exp):
-                return exp.contains_variable(variable)
-
+                return 1 + exp.size()
             case MultiExpression(operator, expressions):
-                for exp in expressions:
-                    if exp.contains_variable(variable):
-                        return True
-                return False
-            case Predicate(operator, terms):
-                return variable in terms
-            case AtomicProposition(name):
-                return False
+                return 1 + sum(exp.size() for exp in expressions)
             case _:
-                raise ValueError("This Expression is not known")
+                return 1
 
-    def contains_variable_by_name(self, var_name:str):
-        return self.contains_variable(Variable(var_name))
+    def info(self) -> 'FormulaInfo':
+        """
+        Returns the static facts about the expression (see FormulaInfo). They are computed once per node and cached on it.
+        """
+        info = self.__dict__.get("_info")
+        if info == None:
+            info = FormulaInfo.of(self)
+            self.__dict__["_info"] = info
+        return info
+
+    def __getstate__(self):
+        # The cached FormulaInfo contains the node itself, it is not pickled but recomputed on demand
+        state = dict(self.__dict__)
+        state.pop("_info", None)
+        return state
+
+
+@dataclass(frozen=True)
+class FormulaInfo:
+
+    """
+    Static facts about an expression:
+    - horizon   : int       : number of future trace positions the expression looks ahead, i.e. the sum of the upper interval
+                              bounds down to the leaves (None if an interval is unbounded). Past operators do not add to it.
+    - depth     : int       : maximal nesting depth of temporal operators
+    - atoms     : frozenset : predicates and atomic propositions the expression reads
+    - variables : frozenset : variables occurring in the predicates of the expression
+    - past      : bool      : the expression contains a past operator (P, O)
+    - constants : bool      : the expression contains true or false
+    """
+
+    horizon : Optional[int]
+    depth : int
+    atoms : frozenset
+    variables : frozenset
+    past : bool
+    constants : bool = False
+
+    def of(exp : Expression) -> 'FormulaInfo':
+        match exp:
+            case UnaryExpression(TempUnOp(name, (a,b)), sub):
+                info = sub.info()
+                if name in ['P', 'O']:
+                    horizon = info.horizon
+                elif name == 'X':
+                    horizon = None if info.horizon == None else info.horizon + a
+                else:
+                    horizon = None if (info.horizon == None or b == None) else info.horizon + b
+                return FormulaInfo(horizon, info.depth + 1, info.atoms, info.variables, info.past or name in ['P', 'O'], info.constants)
+
+            case UnaryExpression(_, sub):
+                return sub.info()
+
+            case BinaryExpression(operator, exp1, exp2):
+                info = FormulaInfo.combine([exp1.info(), exp2.info()])
+                match operator:
+                    case TempBinOp(_, (a,b)):
+                        horizon = None if (info.horizon == None or b == None) else info.horizon + b
+                        return FormulaInfo(horizon, info.depth + 1, info.atoms, info.variables, info.past, info.constants)
+                return info
+
+            case MultiExpression(_, expressions):
+                return FormulaInfo.combine([sub.info() for sub in expressions])
+
+            case Predicate(_, terms):
+                return FormulaInfo(0, 0, frozenset([exp]), frozenset(term for term in terms if isinstance(term, Variable)), False)
+
+            case AtomicProposition(_):
+                return FormulaInfo(0, 0, frozenset([exp]), frozenset(), False)
+
+            case Wahr() | Falsch():
+                return FormulaInfo(0, 0, frozenset(), frozenset(), False, True)
+
+            case _:
+                return FormulaInfo(0, 0, frozenset(), frozenset(), False)
+
+    def combine(infos : List['FormulaInfo']) -> 'FormulaInfo':
+        # Facts of a logical operator over the given operands
+        horizons = [info.horizon for info in infos]
+        return FormulaInfo(None if None in horizons else max(horizons),
+                           max(info.depth for info in infos),
+                           frozenset().union(*[info.atoms for info in infos]),
+                           frozenset().union(*[info.variables for info in infos]),
+                           any(info.past for info in infos),
+                           any(info.constants for info in infos))
 
 @dataclass
 class AtomicProposition(Expression):
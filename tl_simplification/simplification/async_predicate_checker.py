@@ -0,0 +1,84 @@
+import asyncio
+from typing import List, Callable, Tuple
+
+from tl_simplification.ltl import Expression
+from tl_simplification.utils.int_set import IntegerSet
+from tl_simplification.simplification.predicate_checker import PredicateChecker
+from tl_simplification.simplification.predicate_cache import PredicateCache
+
+"""
+PredicateChecker for I/O bound predicates.
+
+interval_simplification checks predicates synchronously and one after another. If the evaluation of a predicate waits
+for a server or a database, the waiting times add up. AsyncPredicateChecker accepts async evaluation functions and
+resolves all predicate atoms of a formula concurrently before the simplification starts, so the total waiting time is
+about the one of the slowest query.
+"""
+
+
+class AsyncPredicateChecker(PredicateChecker):
+
+    """
+    In addition to add_predicate / add_bulk_predicate:
+
+    add_async_predicate(
+        pred_name : Name of the predicate
+        eval_func : async function that returns two IntegerSets where the predicate (with input) is true and false
+        input_len : number of inputs expected for the predicate )
+
+    Call prefetch(exp) (or await prefetch_async(exp) inside an event loop) before interval_simplification. At most
+    max_concurrency evaluations run at the same time. Async predicates that were not prefetched are evaluated
+    synchronously when they are checked, which is not possible while an event loop is running in the same thread.
+    """
+
+    def __init__(self, max_concurrency : int = 8, cache : PredicateCache = None):
+        super().__init__(cache)
+        assert max_concurrency > 0
+        self.max_concurrency = max_concurrency
+
+    def add_async_predicate(self, pred_name, eval_func : Callable, input_len):
+        self.predicates[pred_name] = {
+            "input_len": input_len,
+            "eval": eval_func,
+            "windowed": False,
+            "bulk": False,
+            "async": True
+        }
+
+    def evaluate(self, predicate : dict, constant_lists : List[List[str]]) -> List[Tuple[IntegerSet, IntegerSet]]:
+        if not predicate.get("async", False):
+            return super().evaluate(predicate, constant_lists)
+        return asyncio.run(self.gather(predicate, constant_lists, asyncio.Semaphore(self.max_concurrency)))
+
+    def prefetch(self, exp : Expression):
+        asyncio.run(self.prefetch_async(exp))
+
+    async def prefetch_async(self, exp : Expression):
+        """
+        Evaluates every ground predicate atom of exp that is not cached yet. The async predicates are evaluated
+        concurrently, the others as in PredicateChecker.prefetch.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        missing = self.claim_missing(exp)
+        try:
+            jobs = []
+            for pred_name, constant_lists in missing.items():
+                predicate = self.predicates[pred_name]
+                if predicate.get("async", False):
+                    jobs.append((pred_name, constant_lists, self.gather(predicate, constant_lists, semaphore)))
+                else:
+                    for constants, sets in zip(constant_lists, self.evaluate(predicate, constant_lists)):
+                        self.store(pred_name, constants, sets)
+
+            results = await asyncio.gather(*[job for _, _, job in jobs])
+            for (pred_name, constant_lists, _), sets_list in zip(jobs, results):
+                for constants, sets in zip(constant_lists, sets_list):
+                    self.store(pred_name, constants, sets)
+        finally:
+            self.release_missing(missing)
+
+    async def gather(self, predicate : dict, constant_lists : List[List[str]], semaphore : asyncio.Semaphore):
+        async def evaluate_one(constants):
+            async with semaphore:
+                return await predicate["eval"](constants)
+        return await asyncio.gather(*[evaluate_one(constants) for constants in constant_lists])
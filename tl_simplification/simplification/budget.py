@@ -0,0 +1,80 @@
+import time
+
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+"""
+Time and size budgets for the IntervalSimplification algorithm.
+
+Formulas with wide intervals over long horizons can take a long time to simplify and can produce large residuals. With a
+Budget in the SimplificationOptions the engine stops refining once the budget is used up. The time budget is checked
+at every node and in the per position loops of the Simplify functions of G, F, U and of conjunctions / disjunctions,
+so a single slow node is cut short as well. The result stays sound: every node (or position of a node) that is not
+simplified anymore is mapped to itself, i.e. to the original subformula. Positions that were
+already decided keep their truth values. Budget.exhausted tells the caller that the result has been truncated.
+"""
+
+
+class Budget:
+
+    """
+    - seconds  : float : wall-clock time for one call of interval_simplification, measured from the first node
+    - max_size : int   : maximal total size (number of nodes) of the residuals of one node. Larger mappings keep their
+                         decided positions, all other positions are mapped to the original subformula.
+    - exhausted : bool : set as soon as one of the budgets has been used up
+    A Budget is meant for one call. With a ProcessPoolExecutor the workers only see copies of the budget.
+    """
+
+    def __init__(self, seconds : float = None, max_size : int = None):
+        self.seconds = seconds
+        self.max_size = max_size
+        self.deadline = None
+        self.exhausted = False
+
+    def expired(self) -> bool:
+        # Checks the time budget. The clock starts with the first check
+        if self.seconds == None:
+            return False
+        if self.deadline == None:
+            self.deadline = time.monotonic() + self.seconds
+            return False
+        if time.monotonic() > self.deadline:
+            self.exhausted = True
+            return True
+        return False
+
+    def truncate(self, exp : Expression, I : IntegerSet) -> BiDict:
+        # Mapping of a node that is not simplified anymore
+        S = BiDict()
+        S.add_exp_in(exp, I)
+        return S
+
+    def fill(self, exp : Expression, I : IntegerSet, S : BiDict) -> BiDict:
+        # Maps the positions of I that a Simplify loop left out when the time was up to exp
+        covered = IntegerSet.empty()
+        for I_exp in S.intervals():
+            covered = covered.union(I_exp)
+        rest = I.without(covered)
+        if not rest.is_empty():
+            S.add_exp_in(exp, rest)
+        return S
+
+    def limit(self, exp : Expression, S : BiDict) -> BiDict:
+        """
+        Applies the size budget to the simplification mapping S of exp. Symbolic residual families are materialized first.
+        """
+        if self.max_size == None:
+            return S
+
+        S = S.materialize()
+        residuals = [residual for residual in S.expressions() if residual != Wahr() and residual != Falsch()]
+        if sum(residual.size() for residual in residuals) <= self.max_size:
+            return S
+
+        self.exhausted = True
+        S_limited = BiDict()
+        S_limited.add_exp_in(Wahr(), S.get_I(Wahr()))
+        S_limited.add_exp_in(Falsch(), S.get_I(Falsch()))
+        for residual in residuals:
+            S_limited.add_exp_in(exp, S.get_I(residual))
+        return S_limited
@@ -0,0 +1,73 @@
+from typing import List
+
+from tl_simplification.ltl import *
+import tl_simplification.ltl as LTL
+from tl_simplification.utils.int_set import BiDict
+
+"""
+Canonical form of formulas for better reuse of equal formulas.
+
+a & b and b & a are different keys of a BiDict and of every other dictionary, although they are equivalent. The Simplify
+functions build their residuals in the order of the operands and the order in which the expressions of the child mappings
+appear, so equivalent residuals show up in different orders. canonicalize sorts the operands of and, or, iff, conjunctions
+and disjunctions by their node type and structure and removes duplicate operands. With an intern table, equal
+(sub)formulas are replaced by one shared object.
+"""
+
+
+def canonicalize(exp : Expression, table : dict = None) -> Expression:
+        """
+        Returns the canonical form of exp. If table is given, every canonical subformula is looked up in table and
+        replaced by the object stored there (new subformulas are added).
+        """
+        match exp:
+            case BinaryExpression(LogicBinOp(op), exp_l, exp_r) if op in ["and", "or", "iff"]:
+                operands = sort_operands([canonicalize(exp_l, table), canonicalize(exp_r, table)])
+                if len(operands) == 1:
+                    result = Wahr() if op == "iff" else operands[0]         # a <-> a = true, a & a = a | a = a
+                else:
+                    result = BinaryExpression(LogicBinOp(op), operands[0], operands[1])
+
+            case MultiExpression(LogicMultiOp(op), expressions):
+                operands = sort_operands([canonicalize(sub, table) for sub in expressions])
+                result = LTL.conjunction(operands) if op == "conjunction" else LTL.disjunction(operands)
+
+            case BinaryExpression(operator, exp_l, exp_r):
+                result = BinaryExpression(operator, canonicalize(exp_l, table), canonicalize(exp_r, table))
+
+            case UnaryExpression(operator, sub):
+                result = UnaryExpression(operator, canonicalize(sub, table))
+
+            case _:
+                result = exp
+
+        if table == None:
+            return result
+        return table.setdefault(result, result)
+
+
+def sort_operands(operands : List[Expression]) -> List[Expression]:
+        """
+        Sorts the operands and removes duplicates. Different formulas can have the same string (e.g. the atomic proposition
+        a and the predicate a, or p(X) with a variable and with a constant X), so duplicates are found by structural
+        equality and the sort key contains the node types.
+        """
+        unique = {}
+        for operand in operands:
+            unique.setdefault(operand, operand)
+        return sorted(unique, key=lambda operand: (type(operand).__name__, repr(operand)))
+
+
+def canonical_mapping(S : BiDict, table : dict) -> BiDict:
+        """
+        Replaces every formula of the simplification mapping S by its canonical form. Formulas that become equal share their
+        positions afterwards. Returns S unchanged if table is None. Symbolic residual families are materialized first.
+        """
+        if table == None:
+            return S
+
+        S = S.materialize()
+        S_canonical = BiDict()
+        for exp in S.expressions():
+            S_canonical.add_exp_in(canonicalize(exp, table), S.get_I(exp))
+        return S_canonical
@@ -0,0 +1,147 @@
+from typing import List, Tuple
+
+from tl_simplification.ltl import *
+import tl_simplification.ltl as LTL
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+"""
+Compaction of the simplified formulas returned by interval_simplification.
+
+The Simplify functions build their residuals locally, e.g. simplify_G emits one G operator for every interval of
+S_r(phi) in the window and simplify_multi keeps the residuals of its children side by side. The results therefore
+contain nested conjunctions, duplicate operands and temporal operators on the same operand whose windows overlap.
+compact rewrites such a formula bottom up into a smaller equivalent one:
+- nested conjunctions / disjunctions are flattened, duplicates and neutral operands are removed
+- G windows on the same operand are merged in conjunctions, F windows in disjunctions
+- absorption: a & (a | b) = a, G[a,b] phi & F[c,d] phi = G[a,b] phi if the windows intersect (and the duals)
+- conjunctions and disjunctions with a single operand are replaced by that operand
+
+The absorption of F by G assumes infinite traces. On a finite trace (see finite.py) G[a,b] phi holds if the window lies
+after the end of the trace, but F[c,d] phi does not. With a trace_length this rule is therefore skipped; all other rules
+hold on finite traces as well.
+"""
+
+
+def compact(exp : Expression, trace_length : int = None) -> Expression:
+        N = trace_length
+        match exp:
+            case MultiExpression(LogicMultiOp(op), expressions):
+                return compact_operands(op, [compact(e, N) for e in expressions], N)
+
+            case BinaryExpression(LogicBinOp("and"), exp_l, exp_r):
+                return compact_operands("conjunction", [compact(exp_l, N), compact(exp_r, N)], N)
+
+            case BinaryExpression(LogicBinOp("or"), exp_l, exp_r):
+                return compact_operands("disjunction", [compact(exp_l, N), compact(exp_r, N)], N)
+
+            case BinaryExpression(operator, exp_l, exp_r):
+                return BinaryExpression(operator, compact(exp_l, N), compact(exp_r, N))
+
+            case UnaryExpression(operator, sub):
+                return UnaryExpression(operator, compact(sub, N))
+
+            case _:
+                return exp
+
+
+def compact_mapping(S : BiDict, trace_length : int = None) -> Tuple[BiDict, int, int]:
+        """
+        Compacts every formula of a simplification mapping (of a finite trace if trace_length is given). Returns the new
+        mapping together with the total size (number of nodes) of its formulas before and after the compaction.
+        """
+        S = S.materialize()
+        S_compact = BiDict()
+        size_before = 0
+        size_after = 0
+        for exp in S.expressions():
+            exp_compact = compact(exp, trace_length)
+            size_before += exp.size()
+            if not S_compact.contains_exp(exp_compact):
+                size_after += exp_compact.size()
+            S_compact.add_exp_in(exp_compact, S.get_I(exp))        # formulas that became equal share their positions
+        return S_compact, size_before, size_after
+
+
+def compact_operands(op : str, operands : List[Expression], trace_length : int = None) -> Expression:
+        # op = "conjunction": neutral element true, absorbing element false and G windows are merged (F for "disjunction")
+        neutral, absorbing, window_op, implied_op = (Wahr(), Falsch(), "G", "F") if op == "conjunction" else (Falsch(), Wahr(), "F", "G")
+
+        flat = []
+        for operand in flatten(op, operands):
+            if operand == absorbing:
+                return absorbing
+            if operand != neutral and operand not in flat:
+                flat.append(operand)
+
+        flat = merge_windows(flat, window_op)
+        flat = [operand for operand in flat if not is_absorbed(operand, flat, op, window_op, implied_op, trace_length == None)]
+
+        if len(flat) == 0:
+            return neutral
+        return LTL.conjunction(flat) if op == "conjunction" else LTL.disjunction(flat)
+
+
+def flatten(op : str, operands : List[Expression]) -> List[Expression]:
+        bin_op = "and" if op == "conjunction" else "or"
+        result = []
+        for operand in operands:
+            match operand:
+                case MultiExpression(LogicMultiOp(name), expressions) if name == op:
+                    result += flatten(op, expressions)
+                case BinaryExpression(LogicBinOp(name), exp_l, exp_r) if name == bin_op:
+                    result += flatten(op, [exp_l, exp_r])
+                case _:
+                    result.append(operand)
+        return result
+
+
+def merge_windows(operands : List[Expression], window_op : str) -> List[Expression]:
+        # Replaces all window_op[a_i,b_i] phi with the same phi by one operator per maximal union of adjacent or overlapping windows
+        windows = {}
+        for operand in operands:
+            match operand:
+                case UnaryExpression(TempUnOp(name, (a,b)), phi) if name == window_op:
+                    windows.setdefault(phi, []).append((a,b))
+
+        merged = {}
+        for phi, intervals in windows.items():
+            intervals.sort(key=lambda ivl: ivl[0])
+            runs = [list(intervals[0])]
+            for (a,b) in intervals[1:]:
+                end = runs[-1][1]
+                if end == None or a <= end + 1:
+                    runs[-1][1] = None if (end == None or b == None) else max(end, b)
+                else:
+                    runs.append([a,b])
+            merged[phi] = [UnaryExpression(TempUnOp(window_op, tuple(run)), phi) for run in runs]
+
+        # the merged operators take the place of the first operator on the same operand
+        result = []
+        for operand in operands:
+            match operand:
+                case UnaryExpression(TempUnOp(name, _), phi) if name == window_op:
+                    result += merged.pop(phi, [])
+                case _:
+                    result.append(operand)
+        return result
+
+
+def is_absorbed(operand : Expression, operands : List[Expression], op : str, window_op : str, implied_op : str, infinite : bool = True) -> bool:
+        """
+        Checks if operand can be dropped from the conjunction (disjunction) of operands:
+        - a | b is implied by the conjunct a (a & b implies the disjunct a)
+        - F[c,d] phi is implied by the conjunct G[a,b] phi if [a,b] and [c,d] intersect (G[a,b] phi implies the disjunct F[c,d] phi).
+          Only on infinite traces.
+        """
+        dual = "disjunction" if op == "conjunction" else "conjunction"
+        match operand:
+            case MultiExpression(LogicMultiOp(name), expressions) if name == dual:
+                return any(other in expressions for other in operands if other is not operand)
+
+            case UnaryExpression(TempUnOp(name, (c,d)), phi) if name == implied_op and infinite:
+                for other in operands:
+                    match other:
+                        case UnaryExpression(TempUnOp(other_name, (a,b)), other_phi) if other_name == window_op and other_phi == phi:
+                            if (b == None or c <= b) and (d == None or a <= d):
+                                return True
+        return False
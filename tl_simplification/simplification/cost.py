@@ -0,0 +1,98 @@
+import logging
+from dataclasses import dataclass
+from typing import Tuple
+
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+"""
+Cost estimation for simplified formulas.
+
+A residual is not always cheaper to verify than the formula it was derived from. simplify_U for example emits one
+disjunct per split and each of them carries a G operator, and the translation of a formula into an automaton grows
+quickly with the number of operators and the width of their intervals. With a CostModel in the SimplificationOptions
+the engine compares every residual with the original subformula and keeps the original where the residual is too expensive.
+"""
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CostModel:
+
+    """
+    The cost of a formula is the weighted sum of the following features:
+    - nodes  : number of nodes of the syntax tree
+    - depth  : maximal nesting depth of temporal operators
+    - width  : sum of the interval widths of all temporal operators (unbounded intervals count as 1)
+    - states : rough estimate of the number of automaton states. Bounded temporal operators multiply the states of their
+               operands with the length of their interval, unbounded ones add a state.
+    A residual is replaced by the original subformula if cost(residual) > threshold * cost(original).
+    """
+
+    node_weight : float = 1.0
+    depth_weight : float = 1.0
+    width_weight : float = 0.1
+    state_weight : float = 1.0
+    threshold : float = 1.0
+
+    def features(self, exp : Expression) -> Tuple[int, int, int, int]:
+        # Returns (nodes, depth, width, states)
+        match exp:
+            case UnaryExpression(TempUnOp(op, (a,b)), sub):
+                nodes, depth, width, states = self.features(sub)
+                if op in ['X', 'P']:
+                    return nodes+1, depth+1, width+a, states+a
+                if b == None:
+                    return nodes+1, depth+1, width+1, states+1
+                return nodes+1, depth+1, width+b-a+1, states*(b+1)
+
+            case UnaryExpression(_, sub):
+                nodes, depth, width, states = self.features(sub)
+                return nodes+1, depth, width, states
+
+            case BinaryExpression(operator, exp_l, exp_r):
+                nodes_l, depth_l, width_l, states_l = self.features(exp_l)
+                nodes_r, depth_r, width_r, states_r = self.features(exp_r)
+                nodes, width, states = nodes_l+nodes_r+1, width_l+width_r, states_l+states_r
+                match operator:
+                    case TempBinOp(_, (a,b)):
+                        if b == None:
+                            return nodes, max(depth_l, depth_r)+1, width+1, states+1
+                        return nodes, max(depth_l, depth_r)+1, width+b-a+1, states*(b+1)
+                    case _:
+                        return nodes, max(depth_l, depth_r), width, states
+
+            case MultiExpression(_, expressions):
+                features = [self.features(sub) for sub in expressions]
+                return (1 + sum(f[0] for f in features), max(f[1] for f in features),
+                        sum(f[2] for f in features), sum(f[3] for f in features))
+
+            case _:
+                return 1, 0, 0, 1
+
+    def cost(self, exp : Expression) -> float:
+        nodes, depth, width, states = self.features(exp)
+        return self.node_weight*nodes + self.depth_weight*depth + self.width_weight*width + self.state_weight*states
+
+
+def keep_cheaper(exp : Expression, S : BiDict, cost_model : CostModel) -> BiDict:
+        """
+        Replaces every residual in the simplification mapping S of exp that is more expensive than threshold * cost(exp)
+        by exp itself. Symbolic residual families are materialized first.
+        """
+        if cost_model == None:
+            return S
+
+        S = S.materialize()
+        limit = cost_model.threshold * cost_model.cost(exp)
+        S_cheap = BiDict()
+        for residual in S.expressions():
+            if residual != Wahr() and residual != Falsch() and residual != exp:
+                residual_cost = cost_model.cost(residual)
+                if residual_cost > limit:
+                    logger.debug("keeping %s instead of %s at %s (cost %.1f > %.1f)", exp, residual, S.get_I(residual), residual_cost, limit)
+                    S_cheap.add_exp_in(exp, S.get_I(residual))
+                    continue
+            S_cheap.add_exp_in(residual, S.get_I(residual))
+        return S_cheap
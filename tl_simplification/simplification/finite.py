@@ -0,0 +1,105 @@
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+from tl_simplification.simplification.segments import ResidualFamily
+
+"""
+Finite trace (LTLf) semantics for a trace with a known length N, i.e. with the trace positions 0, ..., N-1.
+
+The semantics at the end of the trace are those of the alive encoding of spot.to_finite_syntax, where alive holds exactly
+at the positions of the trace:
+- X[a] phi  = X[a] (alive & phi)      : false if t+a is not a position of the trace
+- F[a,b] phi = F[a,b] (alive & phi)   : only the positions of the trace are searched
+- G[a,b] phi = G[a,b] (!alive | phi)  : positions after the end of the trace are vacuously true
+- phi U[a,b] psi = phi U[a,b] (alive & psi)
+The past operators P and O never read positions after the end of the trace.
+
+Instead of rewriting the formula, the engine clips every set of trace positions to [0, N) and pads the mapping of each
+operand of a temporal operator with the value the operator assigns to positions after the end of the trace. The tails
+of all sets are then constant from N on, so the Simplify functions stop at N at the latest. For the same reason the
+windows of symbolic residual families (SimplificationOptions.symbolic) end before N. clip_mapping still checks this and
+materializes families whose windows reach past the end of the trace with clipped windows.
+"""
+
+
+def clip(I : IntegerSet, trace_length : int) -> IntegerSet:
+        # Restricts I to the positions of the trace
+        if trace_length == None:
+            return I
+        return I.intersection(IntegerSet.from_interval((0, trace_length-1)))
+
+
+def end_values(op_type):
+        # Returns the values of the left and the right operand of op_type after the end of the trace (None: not read)
+        match op_type:
+            case TempUnOp("G", _):
+                return None, Wahr()
+            case TempUnOp(op, _) if op in ["F", "X"]:
+                return None, Falsch()
+            case TempBinOp("U", _):
+                return Wahr(), Falsch()
+        return None, None
+
+
+def clip_mapping(S : BiDict, trace_length : int) -> BiDict:
+        # Restricts the simplification mapping S to the positions of the trace
+        if trace_length == None:
+            return S
+
+        end = IntegerSet([trace_length], True)
+        S_clipped = BiDict()
+        for exp in S.expressions():
+            I_exp = S.get_I(exp).without(end)
+            if I_exp.is_empty():
+                continue
+            if isinstance(exp, ResidualFamily) and reaches_past(exp, I_exp, trace_length):
+                for t in I_exp:
+                    S_clipped.add_exp_at(clip_windows(exp.at(t), t, trace_length), t)
+            else:
+                S_clipped.add_exp_in(exp, I_exp)
+        return S_clipped
+
+
+def reaches_past(family : ResidualFamily, I : IntegerSet, trace_length : int) -> bool:
+        # Checks if the window of family reads a position >= trace_length at one of the (finitely many) positions of I
+        b = family.segment.b
+        start = family.start_at(I.max())
+        for _, phi_terms in family.segment.terms:
+            for (x, y, clip_l, clip_r) in phi_terms:
+                end = (None if b == None else b + I.max()) if clip_r else (None if y == None else y + start)
+                if end == None or end >= trace_length:
+                    return True
+        return False
+
+
+def clip_windows(exp : Expression, t : int, trace_length : int) -> Expression:
+        """
+        Clips the windows of the G and F operators of a residual of G or F at position t to the positions of the trace.
+        Positions after the end satisfy G and do not satisfy F (see above), so a window that lies after the end is
+        replaced by true (G) or false (F).
+        """
+        last = trace_length - 1 - t
+        match exp:
+            case UnaryExpression(TempUnOp(op, (a,b)), phi) if op in ["G", "F"]:
+                if a > last:
+                    return Wahr() if op == "G" else Falsch()
+                return UnaryExpression(TempUnOp(op, (a, last if (b == None or b > last) else b)), phi)
+
+            case MultiExpression(operator, expressions):
+                return MultiExpression(operator, [clip_windows(sub, t, trace_length) for sub in expressions])
+
+            case BinaryExpression(LogicBinOp(op), exp_l, exp_r) if op in ["and", "or"]:
+                return BinaryExpression(LogicBinOp(op), clip_windows(exp_l, t, trace_length), clip_windows(exp_r, t, trace_length))
+        return exp
+
+
+def pad(S : BiDict, value : Expression, trace_length : int) -> BiDict:
+        """
+        Returns a copy of the simplification mapping S of an operand, which maps all positions from trace_length on to value.
+        S is returned unchanged if no trace length or value is given.
+        """
+        if trace_length == None or value == None:
+            return S
+
+        S_padded = clip_mapping(S, trace_length)
+        S_padded.add_exp_in(value, IntegerSet([trace_length], True))
+        return S_padded
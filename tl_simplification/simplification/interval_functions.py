@@ -116,6 +116,33 @@ def interval_X(I_true_r : IntegerSet, I_false_r : IntegerSet, I) -> Tuple[Intege
         
         return I_true, I_false
 
+@typechecked
+def interval_P(I_true_r : IntegerSet, I_false_r : IntegerSet, I) -> Tuple[IntegerSet, IntegerSet]:
+        a = I[0]      # The number of states looked back
+
+        # True Set: P[a] phi holds at t iff phi holds at t-a
+        I_true = I_true_r.addition(a)
+
+        # False Set: additionally all t < a, where t-a is not a trace position
+        I_false = I_false_r.addition(a)
+        if a > 0:
+            I_false = I_false.union(IntegerSet.from_interval((0, a-1)))
+
+        return I_true, I_false
+
+@typechecked
+def interval_O(I_true_r : IntegerSet, I_false_r : IntegerSet, I) -> Tuple[IntegerSet, IntegerSet]:
+        a = I[0]
+        b = I[1]
+
+        # True Set: phi is true at some t-n with n in [a,b]
+        I_true = I_true_r.window_union(a, b)
+
+        # False Set: phi is false at every t-n >= 0 with n in [a,b], i.e. t is not reached by any position where phi is not known to be false
+        I_false = I_false_r.complement().window_union(a, b).complement()
+
+        return I_true, I_false
+
 @typechecked #tested
 def interval_F(I_true_r : IntegerSet, I_false_r : IntegerSet, I) -> Tuple[IntegerSet, IntegerSet]:
         a = I[0]
@@ -0,0 +1,105 @@
+from tl_simplification.ltl import *
+import tl_simplification.ltl as LTL
+from tl_simplification.simplification.compact import flatten
+
+"""
+Normalization of a formula before it is handed to interval_simplification.
+
+Every operator costs one propagate_interval / simplify pass with its own loop over the trace positions and one more layer
+of nesting in the simplified formulas. Chains of temporal operators can often be replaced by a single operator.
+normalize rewrites a formula bottom up into an equivalent one with fewer operators:
+- X chains are folded into one offset and into the window of an adjacent G or F:
+  X[a] X[b] phi = X[a+b] phi, X[a] G[c,d] phi = G[a+c,a+d] phi, G[c,d] X[a] phi = G[c+a,d+a] phi (F alike)
+- nested windows of the same operator are merged: G[a,b] G[c,d] phi = G[a+c,b+d] phi (F alike)
+- negations are pushed to the leaves (negation normal form). They stop at U, P and O, which have no dual operator here.
+- nested conjunctions / disjunctions are flattened into one MultiExpression
+
+With a trace_length the rewriting keeps the finite trace semantics of finite.py, where X is a strong next (false after
+the end of the trace) and G is weak (true after the end of the trace). X[a] G[c,d] phi and G[c,d] X[a] phi differ from
+G[a+c,a+d] phi at the end of the trace and not X[a] phi is not X[a] not phi, so these rules are left out. All other
+rules hold on finite traces as well.
+"""
+
+
+def normalize(exp : Expression, trace_length : int = None) -> Expression:
+        """
+        Returns an equivalent formula with fewer operators. If trace_length is given, the result is equivalent on finite
+        traces of that length (see above).
+        """
+        N = trace_length
+        match exp:
+            case UnaryExpression(LogicUnOp("not"), sub):
+                return negate(sub, N)
+
+            case UnaryExpression(TempUnOp(op, (a,b)), sub):
+                return fold(op, (a,b), normalize(sub, N), N)
+
+            case BinaryExpression(LogicBinOp(op), exp_l, exp_r) if op in ["and", "or"]:
+                return join("conjunction" if op == "and" else "disjunction", [normalize(exp_l, N), normalize(exp_r, N)])
+
+            case BinaryExpression(LogicBinOp("imp"), exp_l, exp_r):
+                return join("disjunction", [negate(exp_l, N), normalize(exp_r, N)])
+
+            case BinaryExpression(operator, exp_l, exp_r):
+                return BinaryExpression(operator, normalize(exp_l, N), normalize(exp_r, N))
+
+            case MultiExpression(LogicMultiOp(op), expressions):
+                return join(op, [normalize(sub, N) for sub in expressions])
+
+            case _:
+                return exp
+
+
+def negate(exp : Expression, trace_length : int = None) -> Expression:
+        # Returns the negation normal form of not exp
+        N = trace_length
+        match exp:
+            case Wahr():
+                return Falsch()
+
+            case Falsch():
+                return Wahr()
+
+            case UnaryExpression(LogicUnOp("not"), sub):
+                return normalize(sub, N)
+
+            case UnaryExpression(TempUnOp(op, (a,b)), sub) if op in ["G", "F"] or (op == "X" and N == None):
+                dual = {"G": "F", "F": "G", "X": "X"}[op]
+                return fold(dual, (a,b), negate(sub, N), N)
+
+            case BinaryExpression(LogicBinOp(op), exp_l, exp_r) if op in ["and", "or"]:
+                return join("disjunction" if op == "and" else "conjunction", [negate(exp_l, N), negate(exp_r, N)])
+
+            case BinaryExpression(LogicBinOp("imp"), exp_l, exp_r):
+                return join("conjunction", [normalize(exp_l, N), negate(exp_r, N)])
+
+            case MultiExpression(LogicMultiOp(op), expressions):
+                return join("disjunction" if op == "conjunction" else "conjunction", [negate(sub, N) for sub in expressions])
+
+            case _:
+                return UnaryExpression(LogicUnOp("not"), normalize(exp, N))
+
+
+def fold(op : str, interval, sub : Expression, trace_length : int = None) -> Expression:
+        # Builds op[interval] sub for a normalized sub and merges it with the outermost operator of sub where possible
+        a, b = interval
+        infinite = trace_length == None
+        match op, sub:
+            case ("X", UnaryExpression(TempUnOp(inner, (c,d)), phi)) if inner in ["X", "F"] or (inner == "G" and infinite):
+                return UnaryExpression(TempUnOp(inner, (a+c, None if d == None else a+d)), phi)
+
+            case (("G" | "F"), UnaryExpression(TempUnOp("X", (c,_)), phi)) if op == "F" or infinite:
+                return UnaryExpression(TempUnOp(op, (a+c, None if b == None else b+c)), phi)
+
+            case (("G" | "F"), UnaryExpression(TempUnOp(inner, (c,d)), phi)) if inner == op:
+                return UnaryExpression(TempUnOp(op, (a+c, None if (b == None or d == None) else b+d)), phi)
+
+        return UnaryExpression(TempUnOp(op, interval), sub)
+
+
+def join(op : str, operands : List[Expression]) -> Expression:
+        # Conjunction (op = "conjunction") or disjunction of the normalized operands without nested conjunctions (disjunctions)
+        operands = flatten(op, operands)
+        if len(operands) == 2:
+            return LTL._and(*operands) if op == "conjunction" else LTL._or(*operands)
+        return LTL.conjunction(operands) if op == "conjunction" else LTL.disjunction(operands)
@@ -0,0 +1,68 @@
+from dataclasses import dataclass
+from typing import Optional
+from concurrent.futures import Executor
+
+from tl_simplification.simplification.cost import CostModel
+from tl_simplification.simplification.statistics import SimplificationStatistics
+from tl_simplification.simplification.budget import Budget
+
+"""
+Optional settings for the IntervalSimplification algorithm.
+
+An instance of SimplificationOptions is handed down through every recursive call of interval_simplification.
+Leaving it out (or passing None) runs the algorithm exactly as described in my thesis.
+"""
+
+
+@dataclass
+class SimplificationOptions:
+
+    """
+    - executor   : Executor  : if set, the per timestep loops of the temporal Simplify functions are split into chunks
+                               of trace positions that are computed on this executor (e.g. a ProcessPoolExecutor)
+    - chunk_size : int       : number of trace positions that are handed to one worker
+    - subtree_executor : Executor : if set, sibling subformulas (children of a MultiExpression or both sides of a
+                                    BinaryExpression) are simplified concurrently on this executor. Subformulas handed
+                                    to a worker are simplified serially inside that worker.
+    - min_subtree_size : int : subformulas with fewer nodes are always simplified inline
+    - symbolic : bool        : if set, G and F store the simplified formulas of a whole segment of trace positions as one
+                               ResidualFamily (e.g. "t -> G[12-t,40-t] phi") instead of one formula per trace position.
+                               BiDict.get_at_timestep materializes them on demand. This only saves memory in the
+                               mapping of the root: every parent operator materializes the families of its operands
+                               per trace position.
+    - cost_model : CostModel : if set, residuals that are more expensive than the original subformula (see cost.py) are
+                               replaced by the original subformula at every node
+    - narrow : bool          : if set, the operands of and, or, imp and of conjunctions / disjunctions are simplified one
+                               after another and positions that are already decided are not passed on to the following
+                               operands. Ignored if subtree_executor is set.
+    - statistics : SimplificationStatistics : if set, the time and the decided positions of every operand of a logical
+                               operator are recorded (see statistics.py). With narrow the operands of and, or,
+                               conjunctions and disjunctions are simplified in the order suggested by the statistics
+    - fast_path : bool       : if set, subformulas without any knowledge in the window they read (no true / false and no
+                               predicate that is known there) are mapped to themselves without running Simplify
+    - canonical : dict       : if set (e.g. to {}), the residuals of every node are brought into canonical form (see
+                               canonical.py) and interned in this table. Equal residuals are then shared objects, also
+                               across calls that use the same table.
+    - budget : Budget        : if set, the engine stops simplifying once the time or size budget is used up and maps the
+                               remaining positions to the original subformula (see budget.py). budget.exhausted tells
+                               if the result has been truncated.
+    - trace_length : int     : if set, formulas are evaluated on a finite trace with the positions 0, ..., trace_length-1
+                               (LTLf semantics, see finite.py). Positions after the end of the trace are not simplified.
+    """
+
+    executor : Optional[Executor] = None
+    chunk_size : int = 256
+    subtree_executor : Optional[Executor] = None
+    min_subtree_size : int = 8
+    symbolic : bool = False
+    cost_model : Optional[CostModel] = None
+    narrow : bool = False
+    statistics : Optional[SimplificationStatistics] = None
+    fast_path : bool = False
+    canonical : Optional[dict] = None
+    budget : Optional[Budget] = None
+    trace_length : Optional[int] = None
+
+    def __post_init__(self):
+        assert self.chunk_size > 0
+        assert self.trace_length == None or self.trace_length > 0
@@ -0,0 +1,88 @@
+from dataclasses import replace
+from typing import List
+
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+from tl_simplification.simplification.simplify import simplify, decide, simplify_undecided
+from tl_simplification.simplification.propagate_interval import propagate_interval
+from tl_simplification.simplification.options import SimplificationOptions
+
+"""
+Time partitioned evaluation of the Simplify function.
+
+The case 3 loops of the temporal Simplify functions compute the simplified formula for each trace position t
+individually and only read the simplification mappings of the subformulas. The set of requested trace positions can
+therefore be split into chunks which are simplified independently on an executor. The resulting mappings are merged afterwards.
+"""
+
+
+def split_positions(I : IntegerSet, no_change_start : int, chunk_size : int) -> List[IntegerSet]:
+        """
+        Splits I into chunks of at most chunk_size trace positions. All positions >= no_change_start end up in the last chunk,
+        as the Simplify functions assign one formula to all of them at once.
+        """
+        chunks = []
+        head = []
+        for t in I:
+            if t >= no_change_start:
+                break
+            head.append(t)
+            if len(head) == chunk_size:
+                chunks.append(IntegerSet(head, False))
+                head = []
+
+        if len(head) > 0:
+            chunks.append(IntegerSet(head, False))
+
+        tail = I.intersection(IntegerSet([max(no_change_start, 0)], True))
+        if not tail.is_empty():
+            chunks.append(tail)
+
+        return chunks
+
+
+def simplify_chunked(op_type, I : IntegerSet, S_r : BiDict, S_l = None, options : SimplificationOptions = None, exp = None) -> BiDict:
+        """
+        Computes simplify(op_type, I, S_r, S_l) by simplifying chunks of I on options.executor. Case 1 & 2 are evaluated
+        once for all of I, only the case 3 loop runs on the executor. Every chunk gets the part of S_r and S_l it reads
+        (see propagate_interval), so a process pool does not pickle the whole mappings for each chunk.
+        If no executor is given the Simplify function is called directly.
+        """
+        if options == None or options.executor == None or I.is_empty():
+            return simplify(op_type, I, S_r, S_l, options, exp)
+
+        no_change_start = S_r.no_change_start()
+        if S_l != None:
+            no_change_start = max(no_change_start, S_l.no_change_start())
+
+        S_r = S_r.materialize()
+        if S_l != None:
+            S_l = S_l.materialize()
+
+        I_true, I_false = decide(op_type, S_r, S_l)
+        I_rest = I.without(I_true.union(I_false))
+        S = BiDict()
+        S.add_exp_in(Wahr(), I_true)
+        S.add_exp_in(Falsch(), I_false)
+
+        chunks = split_positions(I_rest, no_change_start, options.chunk_size)
+        if len(chunks) <= 1:
+            S_chunks = [simplify_undecided(op_type, I_rest, S_r, S_l, options, exp)]
+        else:
+            # Executors can not be handed to other processes
+            worker_options = replace(options, executor=None, subtree_executor=None)
+            futures = []
+            for chunk in chunks:
+                if S_l != None:
+                    I_l, I_r = propagate_interval(chunk, op_type)
+                    futures.append(options.executor.submit(simplify_undecided, op_type, chunk, S_r.restrict(I_r), S_l.restrict(I_l), worker_options, exp))
+                else:
+                    I_r = propagate_interval(chunk, op_type)
+                    futures.append(options.executor.submit(simplify_undecided, op_type, chunk, S_r.restrict(I_r), None, worker_options, exp))
+            S_chunks = [future.result() for future in futures]
+
+        # Merge the simplification mappings of all chunks
+        for S_chunk in S_chunks:
+            for exp in S_chunk.expressions():
+                S.add_exp_in(exp, S_chunk.get_I(exp))
+        return S
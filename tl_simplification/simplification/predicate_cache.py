@@ -0,0 +1,92 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+from tl_simplification.utils.int_set import IntegerSet
+
+"""
+Cache of the PredicateChecker.
+
+Each entry holds the evaluated truth sets of one predicate atom, keyed by (predicate name, tuple of constant names).
+The cache can be bounded by the number of entries and by an estimate of their size in bytes. The least recently used
+entries are evicted first. Entries can expire after a time to live (ttl), and all entries of a scenario can be
+invalidated at once, e.g. when a service moves on to the next scenario.
+"""
+
+
+class PredicateCache:
+
+    """
+    - max_entries : int   : maximal number of entries (None: unbounded)
+    - max_bytes   : int   : maximal estimated size of all entries in bytes (None: unbounded)
+    - ttl         : float : seconds after which an entry is not used anymore (None: entries do not expire)
+    - hits, misses, evictions : int : counters. Expired entries count as misses, invalidated entries are not evictions.
+    """
+
+    def __init__(self, max_entries : int = None, max_bytes : int = None, ttl : float = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()            # key -> (value, scenario, time of insertion, size)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key : Tuple[str, tuple]):
+        # Returns the value stored for key or None
+        entry = self.entries.get(key)
+        if entry != None and self.ttl != None and time.monotonic() - entry[2] > self.ttl:
+            self.remove(key)
+            entry = None
+
+        if entry == None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key : Tuple[str, tuple], value : tuple, scenario = None):
+        if key in self.entries:
+            self.remove(key)
+
+        size = estimate_size(value)
+        self.entries[key] = (value, scenario, time.monotonic(), size)
+        self.bytes += size
+
+        while len(self.entries) > 1 and ((self.max_entries != None and len(self.entries) > self.max_entries) or
+                                         (self.max_bytes != None and self.bytes > self.max_bytes)):
+            self.remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def remove(self, key : Tuple[str, tuple]):
+        self.bytes -= self.entries.pop(key)[3]
+
+    def invalidate(self, pred_name : str = None, scenario = None):
+        # Removes all entries of the predicate pred_name and / or the scenario. Without arguments the cache is cleared
+        for key in [key for key, entry in self.entries.items()
+                    if (pred_name == None or key[0] == pred_name) and (scenario == None or entry[1] == scenario)]:
+            self.remove(key)
+
+    def __contains__(self, key : Tuple[str, tuple]) -> bool:
+        # Checks if an unexpired value is stored for key without counting a hit or a miss and without marking it as used
+        entry = self.entries.get(key)
+        return entry != None and (self.ttl == None or time.monotonic() - entry[2] <= self.ttl)
+
+    def stats(self) -> dict:
+        return {"entries": len(self.entries), "bytes": self.bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def estimate_size(value : tuple) -> int:
+        # Rough size of a cached tuple of IntegerSets in bytes
+        size = sys.getsizeof(value)
+        for item in value:
+            if isinstance(item, IntegerSet):
+                size += sys.getsizeof(item) + sys.getsizeof(item.int_set) + 28 * len(item.int_set)
+        return size
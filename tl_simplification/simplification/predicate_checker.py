@@ -1,9 +1,12 @@
+import threading
+from concurrent.futures import Future, wait
 from typing import List, Callable
 from typeguard import typechecked
-from typing import List, Tuple
+from typing import List, Tuple, Optional
 
-from tl_simplification.ltl import Constant
+from tl_simplification.ltl import Constant, Expression, Predicate
 from tl_simplification.utils.int_set import IntegerSet
+from tl_simplification.simplification.predicate_cache import PredicateCache
 
 class PredicateChecker():
 
@@ -15,101 +18,242 @@ class PredicateChecker():
     add_predicate(
         pred_name : Name of the predicate
         eval_func : Function that returns two IntegerSets where the predicate (with input) is true and false
-        input_len : number of inputs expected for the predicate )
+        input_len : number of inputs expected for the predicate
+        windowed  : optional, see below )
 
     Thats it. An example can be found in main.ipynb.
+
+    Predicates whose callback can evaluate many inputs at once are registered with add_bulk_predicate. prefetch(exp)
+    evaluates all predicate atoms of a formula before the simplification starts.
+
+    If windowed is set, eval_func receives the set of trace positions that are needed as a second argument,
+    eval_func(constants, I), and only has to return what is known within I. The checker remembers for every input which
+    positions are known already and only asks for the missing ones.
+
+    The evaluated truth sets are kept in a PredicateCache. Pass a bounded cache, e.g.
+    PredicateChecker(PredicateCache(max_entries=10000, ttl=60)), for long running services.
+
+    One PredicateChecker can be shared by several threads. Every predicate atom is evaluated by one thread only, other
+    threads that need the same atom wait for the result instead of evaluating it again.
     """
 
 
-    def __init__(self):
-        self.cache = {}
+    def __init__(self, cache : PredicateCache = None):
+        self.predicates = {}
+        self.cache = PredicateCache() if cache == None else cache
+        self.scenario = None
+        self.lock = threading.RLock()           # guards cache and pending
+        self.pending = {}                       # cache key -> Future that is done when the evaluating thread is finished
 
         """
-        The structure of the cache works as follows:
-
-        cache = {
-            example_predicate1 = {
+        predicates = {
+            example_predicate = {
                 eval: func (list[str]) -> IntegerSet,IntegerSet
-                check: IntegerSet,IntegerSet                   // Checks if predicate is always true/false for any input
                 input_len: int
-                V8: {
-                    check: true, false
-                    }
-            }
-
-            example_predicate2 = {
-                eval: func (List[Constant]) -> IntegerSet,IntegerSet
-                check:IntegerSet,IntegerSet                   // Checks if predicate is always true/false for any input
-                V8: {
-                    V12: {
-                        check: true, false
-                        }
-                    }
+                windowed: bool
+                bulk: bool
             }
         }
+
+        The cache maps (pred_name, tuple of constant names) to the truth sets (true, false) of the predicate atom, for
+        windowed predicates to (true, false, known) where known holds the positions that have been evaluated. Once a
+        windowed atom is known at every position, its entry is stored as (true, false) and returned without looking for
+        missing positions. Every lookup still goes through the cache, so the bounds and the ttl apply to all entries.
+        New entries are tagged with self.scenario, see PredicateCache.invalidate.
         """
+
+    def __getstate__(self):
+        # Locks and futures can not be pickled, e.g. for a ProcessPoolExecutor. The copy starts without pending evaluations
+        state = dict(self.__dict__)
+        del state["lock"], state["pending"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.RLock()
+        self.pending = {}
     
     @typechecked
-    def check_predicate(self, pred_name:str, input : List[Constant]) -> Tuple[IntegerSet, IntegerSet]:
+    def check_predicate(self, pred_name:str, input : List[Constant], I : Optional[IntegerSet] = None) -> Tuple[IntegerSet, IntegerSet]:
         """
         This function checks the predicate with given input. The input can only be constants
         For example: 
         pred_name: OnAccessRamp, input: [Constant("V8")] -> would be accepted
         pred_name: OnAccessRamp, input: [Variable("X_{other}")] -> would NOT be accepted
+        I is the set of trace positions that are needed (None: all positions). It is only used for windowed predicates,
+        which may return less than the full truth sets.
         """
-        if not pred_name in self.cache:
+        if not pred_name in self.predicates:
             # Before a predicate can be checked it must be registered
             return IntegerSet.empty(), IntegerSet.empty()
         
-        pred_cache = self.cache[pred_name]
-
-        if len(input) == 0:
-            if "check" in pred_cache:
-                return pred_cache["check"]
-            else:
-                pred_cache["check"] = pred_cache["eval"]([])
-                return pred_cache["check"]
-        
-        assert pred_cache["input_len"] == len(input)
-
-        if "check" in pred_cache:
-            I_true, I_false = pred_cache["check"]
-            if I_true.is_N0() or I_false.is_N0():
-                return I_true, I_false
-        
-        # At this point "check" does not exist or all values or it could hold more information
+        predicate = self.predicates[pred_name]
+        assert len(input) == 0 or predicate["input_len"] == len(input)
 
         constants = [const.name for const in input]
 
+        if predicate["windowed"]:
+            return self.check_window(pred_name, constants, I)
+
+        return self.check_constants(pred_name, constants)
+
+    def check_constants(self, pred_name : str, constants : List[str]) -> Tuple[IntegerSet, IntegerSet]:
         # check if predicate has been evaluated for the same constants before
-        temp = pred_cache
-        in_cache = True
-        for const in constants:
-            if const in temp:
-                temp = temp[const]
-            else:
-                in_cache = False
+        key = (pred_name, tuple(constants))
+        while True:
+            with self.lock:
+                sets = self.cached(pred_name, constants)
+                if sets != None:
+                    return sets
+                future = self.claim(key)
+            if future == None:
                 break
-        
-        
-        if in_cache:
-            return temp["check"]
-        
-        I_true, I_false = pred_cache["eval"](constants)
+            # Another thread evaluates the atom, its result is in the cache afterwards
+            wait([future])
 
-        
-        for const in constants:
-            if not const in pred_cache:
-                pred_cache[const] = {}
-            pred_cache = pred_cache[const]
-        
-        pred_cache["check"] = (I_true, I_false)
+        try:
+            sets = self.evaluate(self.predicates[pred_name], [constants])[0]
+            self.store(pred_name, constants, sets)
+        finally:
+            self.release([key])
+        return sets
+
+    def claim(self, key : tuple) -> Optional[Future]:
+        # Marks key as being evaluated by this thread and returns None, or returns the Future of the thread that evaluates it
+        with self.lock:
+            if key in self.pending:
+                return self.pending[key]
+            self.pending[key] = Future()
+            return None
+
+    def release(self, keys : List[tuple]):
+        # Wakes up the threads that wait for the evaluation of keys
+        with self.lock:
+            futures = [self.pending.pop(key) for key in keys]
+        for future in futures:
+            future.set_result(None)
+
+    def cached(self, pred_name : str, constants : List[str]):
+        # Returns the cached truth sets of the predicate for the constants or None
+        with self.lock:
+            return self.cache.get((pred_name, tuple(constants)))
+
+    def is_cached(self, pred_name : str, constants : List[str]) -> bool:
+        # Like cached, but leaves the counters and the order of the cache unchanged, e.g. for the checks of prefetch
+        with self.lock:
+            return (pred_name, tuple(constants)) in self.cache
+
+    def store(self, pred_name : str, constants : List[str], sets : tuple):
+        with self.lock:
+            self.cache.put((pred_name, tuple(constants)), tuple(sets), self.scenario)
+
+    def invalidate(self, pred_name : str = None, scenario = None):
+        # Removes cached truth sets, e.g. after the data of a predicate or a scenario has changed. See PredicateCache.invalidate
+        with self.lock:
+            self.cache.invalidate(pred_name, scenario)
+
+    def evaluate(self, predicate : dict, constant_lists : List[List[str]]) -> List[Tuple[IntegerSet, IntegerSet]]:
+        # Calls the evaluation function for every list of constants, bulk predicates are called once for all of them
+        if not predicate["bulk"]:
+            return [predicate["eval"](constants) for constants in constant_lists]
+
+        result = predicate["eval"](constant_lists)
+        if len(constant_lists) > 0 and len(result) == 2 and not isinstance(result[0][0], IntegerSet):
+            # (true, false) as two 2-D boolean arrays with one row per list of constants and one column per trace position
+            rows_true, rows_false = result
+            result = [(IntegerSet({t for t, value in enumerate(row_true) if value}, False),
+                       IntegerSet({t for t, value in enumerate(row_false) if value}, False)) for row_true, row_false in zip(rows_true, rows_false)]
+        assert len(result) == len(constant_lists)
+        return list(result)
+
+    def prefetch(self, exp : Expression):
+        """
+        Evaluates every ground predicate atom of exp that is not cached yet before the simplification starts. Bulk
+        predicates are evaluated with one call per predicate. Windowed predicates are left out, they are evaluated for
+        the positions that are needed during the simplification.
+        """
+        missing = self.claim_missing(exp)
+        try:
+            for pred_name, constant_lists in missing.items():
+                for constants, sets in zip(constant_lists, self.evaluate(self.predicates[pred_name], constant_lists)):
+                    self.store(pred_name, constants, sets)
+        finally:
+            self.release_missing(missing)
+
+    def claim_missing(self, exp : Expression) -> dict:
+        # Claims the missing atoms of exp (see missing_atoms) that are not evaluated by another thread already
+        claimed = {}
+        with self.lock:
+            for pred_name, constant_lists in self.missing_atoms(exp).items():
+                constant_lists = [constants for constants in constant_lists if self.claim((pred_name, tuple(constants))) == None]
+                if len(constant_lists) > 0:
+                    claimed[pred_name] = constant_lists
+        return claimed
+
+    def release_missing(self, claimed : dict):
+        self.release([(pred_name, tuple(constants)) for pred_name, constant_lists in claimed.items() for constants in constant_lists])
+
+    def missing_atoms(self, exp : Expression) -> dict:
+        # Returns pred_name -> lists of constants of all ground, registered and not windowed predicate atoms of exp that are not cached
+        missing = {}
+        for atom in sorted(exp.info().atoms, key=str):
+            if not isinstance(atom, Predicate) or atom.name not in self.predicates or self.predicates[atom.name]["windowed"]:
+                continue
+            if not all(isinstance(term, Constant) for term in atom.terms):
+                continue
+            constants = [const.name for const in atom.terms]
+            if constants not in missing.get(atom.name, []) and not self.is_cached(atom.name, constants):
+                missing.setdefault(atom.name, []).append(constants)
+        return missing
+
+    def check_window(self, pred_name : str, constants : List[str], I : Optional[IntegerSet]) -> Tuple[IntegerSet, IntegerSet]:
+        # Evaluates a windowed predicate at the positions of I that are not known yet and adds them to the cache
+        key = (pred_name, tuple(constants))
+        while True:
+            with self.lock:
+                entry = self.cached(pred_name, constants)
+                if entry != None and len(entry) == 2:
+                    return entry                                # known at every position
+                I_true, I_false, known = entry if entry != None else (IntegerSet.empty(), IntegerSet.empty(), IntegerSet.empty())
+
+                missing = (IntegerSet.n0() if I == None else I).without(known)
+                if missing.is_empty():
+                    return I_true, I_false
+                future = self.claim(key)
+            if future == None:
+                break
+            # Another thread evaluates the atom, possibly for other positions
+            wait([future])
+
+        try:
+            new_true, new_false = self.predicates[pred_name]["eval"](constants, missing)
+            I_true, I_false = I_true.union(new_true.intersection(missing)), I_false.union(new_false.intersection(missing))
+            known = known.union(missing)
+            self.store(pred_name, constants, (I_true, I_false) if known.is_N0() else (I_true, I_false, known))
+        finally:
+            self.release([key])
         return I_true, I_false
 
     @typechecked
-    def add_predicate(self, pred_name, eval_func : Callable[[List[str]], Tuple[IntegerSet, IntegerSet]], input_len):
-        self.cache[pred_name] = {
+    def add_predicate(self, pred_name, eval_func : Callable[..., Tuple[IntegerSet, IntegerSet]], input_len, windowed : bool = False):
+        self.predicates[pred_name] = {
+            "input_len": input_len,
+            "eval": eval_func,
+            "windowed": windowed,
+            "bulk": False
+        }
+
+    @typechecked
+    def add_bulk_predicate(self, pred_name, bulk_func : Callable, input_len):
+        """
+        Registers a predicate whose evaluation function takes a list of lists of constants and returns the truth sets
+        for all of them at once: either a list of (I_true, I_false) or two 2-D boolean arrays (true, false) with one row per
+        list of constants and one column per trace position. Positions after the last column are unknown.
+        """
+        self.predicates[pred_name] = {
             "input_len": input_len,
-            "eval": eval_func
+            "eval": bulk_func,
+            "windowed": False,
+            "bulk": True
         }
 
@@ -13,40 +13,23 @@ def propagate_interval(I : IntegerSet, op_type):
         case TempBinOp(op, (a,b)):
             match op:
                 case "U":
-                    if b == None or I.is_inf():
-                        I_l = IntegerSet([I.min()], True)
-                    else:
-                        I_l = IntegerSet([t for t in range(I.min(), I.max()+b)])
-                    
-                    if b == None or I.is_inf():
-                        I_r = IntegerSet([I.min()+a], True)
-                    else:
-                        I_r = IntegerSet([t for t in range(I.min()+a, I.max()+b+1)])
+                    # The left subformula is needed in [t, t+b], the right one in [t+a, t+b] for every t in I
+                    I_l = I.window_union(0, b)
+                    I_r = I.window_union(a, b)
                     return I_l, I_r
         
         case TempUnOp(op, (a,b)):
             match op:    
                 case "G": 
-                    if b == None or I.is_inf():
-                        return IntegerSet([I.min()+a], True)
-                    else:
-                        return IntegerSet.from_interval((I.min() + a, I.max() + b))
+                    return I.window_union(a, b)
                 case "F":
-                    if b == None or I.is_inf():
-                        return IntegerSet([I.min()+a], True)
-                    else:
-                        return IntegerSet.from_interval((I.min() + a, I.max() + b))
+                    return I.window_union(a, b)
                 case "O":
-                    if I.is_inf():
-                        if b == None:
+                    if b == None:
+                        if I.is_inf():
                             return IntegerSet.n0()
-                        else:
-                            return IntegerSet([max(0,I.min()-b)], True)
-                    else:
-                        if b == None:
-                            return IntegerSet.from_interval((0, I.max() - a), False)
-                        else:
-                            return IntegerSet.from_interval((max(0, I.min() - b), I.max() - a), False)
+                        return IntegerSet.from_interval((0, I.max() - a))
+                    return I.window_union(-1 * b, -1 * a)
                 case "X":
                     return I.addition(a)
                 case "P":
@@ -0,0 +1,277 @@
+from bisect import bisect_right
+from typing import List, Tuple
+
+from tl_simplification.ltl import *
+import tl_simplification.ltl as LTL
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+"""
+Sweep line over the simplification mapping of a subformula for the Simplify functions of G and F.
+
+At trace position t these functions look at the window [a+t, b+t] of S_r and emit one operator G[x-t, y-t] phi (or F)
+for every maximal interval [x,y] of S_r(phi) inside the window. The set of intervals in the window and whether they
+are cut off by the window borders only changes at a few breakpoints of t. Between two breakpoints the windowed view
+is identical and only the relative offsets x-t and y-t change. WindowSweep walks these breakpoints once instead of
+intersecting and partitioning the sets of S_r for every t.
+"""
+
+
+class Segment:
+    """
+    Windowed view of S_r that is valid for all t in a segment. For each expression phi it holds a list of
+    terms (x, y, clip_l, clip_r):
+    - clip_l : the interval starts before the window, the relative start is a. Otherwise it is x-t
+    - clip_r : the interval ends after the window, the relative end is b. Otherwise it is y-t (None if y is None)
+    """
+
+    def __init__(self, a, b, terms : List[Tuple[Expression, list]]):
+        self.a = a
+        self.b = b
+        self.terms = terms
+
+    def at(self, t : int) -> List[Tuple[Expression, List[list]]]:
+        # Returns the relative intervals [x-t, y-t] of each expression at trace position t
+        result = []
+        for phi, phi_terms in self.terms:
+            intervals = []
+            for (x, y, clip_l, clip_r) in phi_terms:
+                start = self.a if clip_l else x - t
+                if clip_r:
+                    end = self.b
+                else:
+                    end = None if y == None else y - t
+                intervals.append([start, end])
+            result.append((phi, intervals))
+        return result
+
+
+def residual(op : str, segment : Segment, t : int):
+        """
+        Builds the simplified formula of G (op = "G") or F (op = "F") at trace position t from the windowed view of S_r:
+        G: the conjunction of G[x-t, y-t] phi, F: the disjunction of F[x-t, y-t] phi.
+        Returns None if no expression of S_r overlaps with the window.
+        """
+        outer = []
+        for phi, intervals in segment.at(t):
+            if op == "G":
+                outer.append(LTL.conjunction([LTL.always(phi, ivl) for ivl in intervals]))         # G_[x-t, y-t] phi
+            else:
+                outer.append(LTL.disjunction([LTL.eventually(phi, ivl) for ivl in intervals]))     # F_[x-t, y-t] phi
+
+        if len(outer) == 0:
+            return None
+        return LTL.conjunction(outer) if op == "G" else LTL.disjunction(outer)
+
+
+class ResidualFamily:
+    """
+    Symbolic form of the simplified formulas of G or F for all trace positions of a segment, e.g.
+    "t -> G[12-t,40-t] phi". It is stored in a BiDict in place of one formula per trace position and
+    materialized on demand with at(t) (BiDict.get_at_timestep does this automatically).
+    The terms are stored relative to the first trace position of the segment (start), so segments that only differ by a
+    shift of all intervals have the same shape. One family holds the starts of all segments of its shape and at(t) uses
+    the last start before t, e.g. a periodic S_r gives one family per phase instead of one per segment.
+    """
+
+    def __init__(self, op : str, segment : Segment, start : int):
+        assert op in ['G', 'F']
+        self.op = op
+        terms = [(phi, [(x - start, None if y == None else y - start, clip_l, clip_r) for (x, y, clip_l, clip_r) in phi_terms])
+                 for phi, phi_terms in segment.terms]
+        self.segment = Segment(segment.a, segment.b, terms)
+        self.shape = (op, segment.a, segment.b, tuple((phi, tuple(phi_terms)) for phi, phi_terms in terms))
+        self.starts = [start]
+
+    def add_start(self, start : int):
+        # Adds a later segment of the same shape
+        assert start > self.starts[-1]
+        self.starts.append(start)
+
+    def start_at(self, t : int) -> int:
+        return self.starts[bisect_right(self.starts, t) - 1]
+
+    def at(self, t : int) -> Expression:
+        return residual(self.op, self.segment, t - self.start_at(t))
+
+    def __eq__(self, other):
+        return isinstance(other, ResidualFamily) and self.shape == other.shape and self.starts == other.starts
+
+    def __hash__(self):
+        return hash(self.shape)
+
+    def __str__(self):
+        a = self.segment.a
+        b = self.segment.b
+        shifted = len(self.starts) > 1
+        operands = []
+        for phi, phi_terms in self.segment.terms:
+            for (x, y, clip_l, clip_r) in phi_terms:
+                start = str(a) if clip_l else (f"s{x:+d}-t" if shifted else f"{x + self.starts[0]}-t")
+                if clip_r:
+                    end = str(b)
+                elif y == None:
+                    end = "inf"
+                else:
+                    end = f"s{y:+d}-t" if shifted else f"{y + self.starts[0]}-t"
+                operands.append(f"{self.op}[{start},{end}]({phi})")
+        op = " & " if self.op == "G" else " | "
+        if shifted:
+            return "t -> " + op.join(operands) + f" with s the last of {self.starts} before t"
+        return "t -> " + op.join(operands)
+
+
+class WindowSweep:
+    """
+    Computes the Segment of the window [a+t, b+t] (b = None: [a+t, inf]) for non decreasing trace positions t.
+    """
+
+    def __init__(self, S_r : BiDict, a, b):
+        self.a = a
+        self.b = b
+        self.runs = ordered_runs(S_r)
+        self.first = [0 for _ in self.runs]             # index of the first interval that has not left the window yet
+
+        # Trace positions at which the windowed view changes
+        breakpoints = set()
+        for _, runs in self.runs:
+            for (x, y) in runs:
+                breakpoints.add(x - a + 1)                      # interval starts before the window
+                if y != None:
+                    breakpoints.add(y - a + 1)                  # interval left the window
+                if b != None:
+                    breakpoints.add(x - b)                      # interval enters the window
+                    if y != None:
+                        breakpoints.add(y - b)                  # interval ends inside the window
+        self.breakpoints = sorted(breakpoints)
+
+        self.segment = None
+        self.segment_start = None   # first trace position of the current segment (or the first t asked for)
+        self.segment_end = None     # first trace position after the current segment (None: no more breakpoints)
+
+    def segment_at(self, t : int) -> Segment:
+        if self.segment != None and (self.segment_end == None or t < self.segment_end):
+            return self.segment
+
+        i = bisect_right(self.breakpoints, t)
+        self.segment_end = self.breakpoints[i] if i < len(self.breakpoints) else None
+        self.segment_start = self.breakpoints[i-1] if i > 0 else t
+        self.segment = Segment(self.a, self.b, self.view(t))
+        return self.segment
+
+    def view(self, t : int) -> List[Tuple[Expression, list]]:
+        lo = self.a + t
+        hi = None if self.b == None else self.b + t
+
+        terms = []
+        for k, (phi, runs) in enumerate(self.runs):
+            # skip intervals that have left the window. As t does not decrease they will not enter it again
+            first = self.first[k]
+            while first < len(runs) and runs[first][1] != None and runs[first][1] < lo:
+                first += 1
+            self.first[k] = first
+
+            phi_terms = []
+            for (x, y) in runs[first:]:
+                if hi != None and x > hi:
+                    break
+                clip_l = x < lo
+                clip_r = hi != None and (y == None or y > hi)
+                phi_terms.append((x, y, clip_l, clip_r))
+
+            if len(phi_terms) > 0:
+                terms.append((phi, phi_terms))
+
+        # order by the first position inside the window, such that the view does not depend on positions outside of it
+        terms.sort(key=lambda item: max(item[1][0][0], lo))
+        return terms
+
+
+class PrefixG:
+    """
+    Residual of G[0, x-t-1] over S at trace position t, i.e. the requirement that the subformula holds continuously on [t, x-1].
+    simplify_U needs it for every trace position t and every split [x,y]. Calling simplify_G for each of them would recompute
+    interval_G and partition all sets of S every time. Here the sets are partitioned once and every prefix is answered with
+    a binary search over the intervals.
+    """
+
+    def __init__(self, S : BiDict):
+        self.true_runs = S.get_I(Wahr()).partition()
+        self.false_runs = S.get_I(Falsch()).partition()
+        self.runs = ordered_runs(S)
+
+    def at(self, t : int, x : int) -> Expression:
+        lo = t
+        hi = x - 1
+
+        if hi < lo:                                     # G over an empty interval
+            return Wahr()
+        if len(overlapping(self.false_runs, lo, hi)) > 0:
+            return Falsch()
+        if covers(self.true_runs, lo, hi):
+            return Wahr()
+
+        conjunctions = []
+        for phi, runs in self.runs:
+            inner_conjunctions = []
+            for (s, e) in overlapping(runs, lo, hi):
+                end = hi if (e == None or e > hi) else e
+                inner_conjunctions.append(LTL.always(phi, (max(s, lo) - t, end - t)))       # G_[x'-t, y'-t] phi
+            if len(inner_conjunctions) > 0:
+                conjunctions.append((inner_conjunctions[0].operator.interval[0], LTL.conjunction(inner_conjunctions)))
+
+        # ordered by the first position inside [t, x-1] like the view of WindowSweep
+        conjunctions.sort(key=lambda item: item[0])
+        return LTL.conjunction([conjunction for _, conjunction in conjunctions])
+
+
+class Timeline:
+    """
+    Cursor over the simplification mapping S of one subformula for non decreasing trace positions t. The sets of S are
+    partitioned once into runs [x, y] with a constant formula, at(t) returns the formula of the run that contains t and
+    the first trace position after that run (None: the run is infinite).
+    """
+
+    def __init__(self, S : BiDict):
+        self.runs = []
+        for exp in S.expressions():
+            for (x, y) in S.get_I(exp).partition():
+                self.runs.append((x, y, exp))
+        self.runs.sort(key=lambda run: run[0])
+        self.i = 0
+
+    def at(self, t : int):
+        while self.i < len(self.runs) and self.runs[self.i][1] != None and self.runs[self.i][1] < t:
+            self.i += 1
+
+        if self.i == len(self.runs):
+            return None, None
+        x, y, exp = self.runs[self.i]
+        if x > t:                                       # t is not in the domain of S
+            return None, x
+        return exp, None if y == None else y + 1
+
+
+def ordered_runs(S : BiDict) -> List[Tuple[Expression, List[list]]]:
+        # Partitions the sets of all expressions except true and false. The expressions are ordered by their first trace position,
+        # such that the residuals do not depend on the order in which the positions of S have been computed
+        runs = [(phi, S.get_I(phi).partition()) for phi in S.get_F()]
+        return sorted([(phi, phi_runs) for phi, phi_runs in runs if len(phi_runs) > 0], key=lambda item: item[1][0][0])
+
+
+def covers(runs : List[list], lo : int, hi : int) -> bool:
+        # Checks if one of the sorted, disjoint intervals contains [lo, hi]
+        i = bisect_right(runs, lo, key=lambda run: run[0]) - 1
+        return i >= 0 and (runs[i][1] == None or runs[i][1] >= hi)
+
+
+def overlapping(runs : List[list], lo : int, hi : int) -> List[list]:
+        # Returns the sorted, disjoint intervals that overlap with [lo, hi]
+        i = bisect_right(runs, lo, key=lambda run: run[0]) - 1
+        if i < 0 or (runs[i][1] != None and runs[i][1] < lo):
+            i += 1
+
+        result = []
+        while i < len(runs) and runs[i][0] <= hi:
+            result.append(runs[i])
+            i += 1
+        return result
@@ -4,8 +4,10 @@ from tl_simplification.utils.int_set import IntegerSet, BiDict
 
 
 from tl_simplification.simplification.propagate_interval import propagate_interval
+from tl_simplification.simplification.options import SimplificationOptions
 import tl_simplification.ltl as LTL
 from tl_simplification.simplification.interval_functions import *
+from tl_simplification.simplification.segments import WindowSweep, PrefixG, ResidualFamily, Timeline, residual, ordered_runs, overlapping
 
 """
 Implemtation of the Simplify function from my thesis
@@ -13,80 +15,193 @@ Implemtation of the Simplify function from my thesis
 
 
 @typechecked
-def simplify(op_type, I : IntegerSet, S_r : BiDict, S_l = None):
-        
+def simplify(op_type, I : IntegerSet, S_r : BiDict, S_l = None, options : SimplificationOptions = None, exp = None):
+        """
+        exp is the formula that is simplified. It is only needed by the once operator with an unbounded interval, whose
+        simplified formulas keep changing on infinite sets of trace positions (see simplify_O).
+        """
+        if options == None:
+            options = SimplificationOptions()
+
         match op_type:
             case TempBinOp(op, (a,b)):
                 match op:
-                    case "U": return simplify_U(I, S_l, S_r,a,b)
+                    case "U": return simplify_U(I, S_l, S_r,a,b, options.budget)
                         
             case TempUnOp(op, (a,b)):
                 match op:
-                    case "G": return simplify_G(I, S_r, a,b)
-                    case "F": return simplify_F(I, S_r, a,b)
+                    case "G": return simplify_G(I, S_r, a,b, options.symbolic, options.budget)
+                    case "F": return simplify_F(I, S_r, a,b, options.symbolic, options.budget)
                     case "X": return simplify_X(I, S_r, a)
+                    case "P": return simplify_P(I, S_r, a)
+                    case "O": return simplify_O(I, S_r, a,b, exp)
                                              
             case LogicBinOp(op):
                 match op:
                     case "and": return simplify_AND(I, S_l, S_r)
                     case "or": return simplify_OR(I, S_l, S_r)
                     case "imp": return simplify_IMP(I, S_l, S_r)
+                    case "iff": return simplify_IFF(I, S_l, S_r)
 
             case LogicUnOp(op):
                 match op:
                     case "not": return simplify_NOT(I, S_r)
 
+def decide(op_type, S_r : BiDict, S_l = None):
+        """
+        Case 1 & 2 of the Simplify function of a temporal operator: returns the sets of trace positions at which the
+        formula is true and false. S_r and S_l have to be materialized.
+        """
+        match op_type:
+            case TempBinOp("U", (a,b)):
+                return interval_U(S_l.get_I(Wahr()), S_l.get_I(Falsch()), S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
+            case TempUnOp(op, (a,b)):
+                interval_op = {"G": interval_G, "F": interval_F, "X": interval_X, "P": interval_P, "O": interval_O}[op]
+                if op in ["X", "P"]:
+                    b = None
+                return interval_op(S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
+
+def simplify_undecided(op_type, I : IntegerSet, S_r : BiDict, S_l = None, options : SimplificationOptions = None, exp = None):
+        """
+        Case 3 of the Simplify function of a temporal operator. I must only hold trace positions that case 1 & 2 (decide)
+        left open. S_r and S_l have to be materialized.
+        """
+        if options == None:
+            options = SimplificationOptions()
+
+        S = BiDict()
+        match op_type:
+            case TempBinOp("U", (a,b)): simplify_U_case3(S, I, S_l, S_r, a, b, options.budget)
+            case TempUnOp(op, (a,b)):
+                match op:
+                    case "G" | "F": simplify_window(S, op, I, S_r, a, b, options.symbolic, options.budget)
+                    case "X": simplify_X_case3(S, I, S_r, a)
+                    case "P": simplify_P_case3(S, I, S_r, a)
+                    case "O": simplify_O_case3(S, I, S_r, a, b, exp)
+        return S
+
 @typechecked
-def simplify_multi(op_type, I : IntegerSet, S_sub : List[BiDict]):
+def simplify_multi(op_type, I : IntegerSet, S_sub : List[BiDict], budget = None):
         match op_type:
             case LogicMultiOp(op):
                 match(op):
                 
-                    case "conjunction":
-                        S = S_sub[0]
-                        for i in range(1, len(S_sub)):
-                            S = simplify_AND(I, S, S_sub[i])
-                        return S
-
-                    case "disjunction":
-                        S = S_sub[0]
-                        for i in range(1, len(S_sub)):
-                            S = simplify_OR(I, S, S_sub[i])
-                        return S
+                    case "conjunction": return simplify_MULTI(I, S_sub, Wahr(), Falsch(), budget)
+                    case "disjunction": return simplify_MULTI(I, S_sub, Falsch(), Wahr(), budget)
 
 @typechecked
-def simplify_U(I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b):
+def simplify_MULTI(I : IntegerSet, S_sub : List[BiDict], neutral : Expression, absorbing : Expression, budget = None):
+        """
+        Simplify function for the n-ary conjunction (neutral = true, absorbing = false) and disjunction (neutral = false,
+        absorbing = true). Instead of folding simplify_AND / simplify_OR over the children, all child mappings are combined
+        in one sweep. The simplified formula only changes where one of the child mappings changes, so it is built once per
+        segment between these breakpoints. Children that are neutral at t are dropped.
+        The loop stops once the time budget is used up, the remaining positions are left out (see Budget.fill).
+        """
+        S_sub = [S_i.materialize() for S_i in S_sub]
+        interval_op = interval_And if neutral == Wahr() else interval_Or
+
+        # Case 1 & 2: Formula can be reduced to true or false
+        I_true, I_false = S_sub[0].get_I(Wahr()), S_sub[0].get_I(Falsch())
+        for S_i in S_sub[1:]:
+            I_true, I_false = interval_op(S_i.get_I(Wahr()), S_i.get_I(Falsch()), I_true, I_false)
+        S = BiDict()
+        S.add_exp_in(Wahr(), I_true)
+        S.add_exp_in(Falsch(), I_false)
+        I = I.without(I_true.union(I_false))
+
+        # Case 3
+        no_change_start = max(S_i.no_change_start() for S_i in S_sub)
+        timelines = [Timeline(S_i) for S_i in S_sub]
+        positions = {}
+        segment_end = None
+        simp_exp = None
+        for t in I:
+            if out_of_time(budget):
+                break
+            if simp_exp == None or (segment_end != None and t >= segment_end):
+                simp_exp, segment_end = simplify_MULTI_at(t, timelines, neutral, absorbing)
+
+            if t >= no_change_start:                               # At this point simplified formulas do not change anymore
+                for exp, exp_positions in positions.items():
+                    S.add_exp_in(exp, IntegerSet(exp_positions, False))
+                positions = {}
+                S.add_exp_in(simp_exp, IntegerSet([t], True).intersection(I))
+                break
+            positions.setdefault(simp_exp, []).append(t)
+
+        for exp, exp_positions in positions.items():
+            S.add_exp_in(exp, IntegerSet(exp_positions, False))
+        return S
+
+def out_of_time(budget) -> bool:
+        # Checks the time budget inside the per position loops
+        return budget != None and budget.expired()
+
+def simplify_MULTI_at(t : int, timelines : List[Timeline], neutral : Expression, absorbing : Expression):
+        # Returns the simplified formula at t and the first trace position at which one of the children changes
+        operands = []
+        segment_end = None
+        for timeline in timelines:
+            exp, end = timeline.at(t)
+            if end != None and (segment_end == None or end < segment_end):
+                segment_end = end
+
+            if exp == absorbing:                                    # holds as long as this child does not change
+                return absorbing, end
+            if exp != neutral:
+                operands.append(exp)
+
+        if len(operands) == 0:
+            return neutral, segment_end
+        return (LTL.conjunction(operands) if neutral == Wahr() else LTL.disjunction(operands)), segment_end
+
+@typechecked
+def simplify_U(I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b, budget = None):
         """
         This function is the implementation of the Simplify functino for the Until operator. (Thesis page 21)
+        The loop stops once the time budget is used up, the remaining positions are left out (see Budget.fill).
         """
 
+        S_l = S_l.materialize()
+        S_r = S_r.materialize()
+
         # Case 1 & 2: Formula can be reduced to true or false
-        I_true, I_false = interval_U(S_r.get_I(Wahr()), S_r.get_I(Falsch()), S_l.get_I(Wahr()), S_l.get_I(Falsch()), (a,b))
+        I_true, I_false = interval_U(S_l.get_I(Wahr()), S_l.get_I(Falsch()), S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
         S = BiDict()
         S.add_exp_in(Wahr(), I_true)
         S.add_exp_in(Falsch(), I_false)
         I = I.without(I_true.union(I_false))
 
         # Case 3: Formula can not be reduced to true or false
+        simplify_U_case3(S, I, S_l, S_r, a, b, budget)
+        return S
 
+def simplify_U_case3(S : BiDict, I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b, budget = None):
+        """
+        Case 3 of simplify_U: adds the simplified formula at each t in I to S. S_l and S_r have to be materialized.
+        """
         # J represents the set of all simplifications
         J_l = S_l.get_J()
         J_r = S_r.get_J()
         no_change_start_r = S_r.no_change_start()
         no_change_start_l = S_l.no_change_start()
         no_change_start = max(no_change_start_l, no_change_start_r)
+        prefix_G = PrefixG(S_l)
 
         # We compute the simplification mapping for each trace position / time step specified by I
         for t in I:
+            if out_of_time(budget):
+                break
             
             # 1. step: We comput the Split function and start the "large disjunction"  (Split([a+t, b+t], S_gamma, S_psi))
             #split(J_l, J_r, [a+t, b+t])
             ivl = [a+t, None]
-            if ivl[1] != None:
+            if b != None:
                 ivl[1] = b+t
 
             omega = IntegerSet.from_interval(ivl)
-            splits = IntegerSet.split(J_l, J_r, omega)  
+            splits = sorted(IntegerSet.split(J_l, J_r, omega), key=lambda split: split[0])     # independent of the order of J
 
             disjunction = []
 
@@ -94,9 +209,8 @@ def simplify_U(I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b):
                 x = split[0]
                 y = split[1]
 
-                # computing the part before the "∧" ensuring exp1 holds continously 
-                S_G = simplify_G(IntegerSet([t],False), S_l,0, x-t-1)
-                simp_exp1 = S_G.get_at_timestep(t)
+                # computing the part before the "∧" ensuring exp1 holds continously (G[0, x-t-1] exp1)
+                simp_exp1 = prefix_G.at(t, x)
 
                 # S_gamma(x) and S_psi(x)
                 exp_l = S_l.get_at_timestep(x)
@@ -104,7 +218,7 @@ def simplify_U(I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b):
 
                 
                 if exp_l == Wahr():
-                    right_bound = None if y == None else y-x
+                    right_bound = None if y == None else y-t
                     simp_exp2 = LTL.eventually(exp_r, (x-t, right_bound))
                 else:
                     right_bound = None if y == None else (y-x) 
@@ -122,111 +236,93 @@ def simplify_U(I : IntegerSet, S_l : BiDict, S_r : BiDict, a, b):
             if t >= no_change_start:                               # At this point simplified formulas do not change anymore
                 rest = IntegerSet([t], True).intersection(I)
                 S.add_exp_in(simp_exp, rest)    
-                return S                    
+                return
             else:
                 S.add_exp_at(simp_exp, t)
-        
-        return S
 
 @typechecked
-def simplify_G(I : IntegerSet, S_r : BiDict, a, b):
+def simplify_G(I : IntegerSet, S_r : BiDict, a, b, symbolic : bool = False, budget = None):
         """
         This function is the implementation of the Simplify function for the Globally operator. (Thesis page 18)
+        If symbolic is set, the formulas of each segment of trace positions are stored as one ResidualFamily.
         """
+        S_r = S_r.materialize()
         I_true, I_false = interval_G(S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
         S = BiDict()
         S.add_exp_in(Wahr(), I_true)
         S.add_exp_in(Falsch(), I_false)
         
         I = I.without(I_true.union(I_false))
-
-        no_change_start_r = S_r.no_change_start()
-        for t in I:
-            outer_conjunctions = []
-            F = S_r.get_F()
-                                
-            for phi in F:
-                inner_conjunctions = []
-                if b == None:
-                    timestep_interval = (a+t, None)     # timestep_interval = [a+t,b+t]
-                else:
-                    timestep_interval = (a+t, b+t)
-                                    
-                partitions = IntegerSet.partition(S_r.get_I(phi).intersection(IntegerSet.from_interval(timestep_interval)))
-
-                for ivl in partitions:      # ivl = [x,y]
-                    new_ivl = ivl.copy()
-                    new_ivl[0] -= t
-                    if new_ivl[1] != None:
-                        new_ivl[1] -= t         # new_ivl = [x-t, b-t]
-
-                    inner_conjunctions.append(LTL.always(phi,new_ivl))         # G_[x-t, b-t] phi
-
-                outer_conjunctions.append(LTL.conjunction(inner_conjunctions))
-
-
-            simp_exp = LTL.conjunction(outer_conjunctions)
-
-            if t >= no_change_start_r:                               # At this point simplified formulas do not change anymore
-                rest = IntegerSet([t], True).intersection(I)
-                S.add_exp_in(simp_exp, rest)    
-                return S                    
-            else:
-                S.add_exp_at(simp_exp, t)
-                            
+        simplify_window(S, "G", I, S_r, a, b, symbolic, budget)
         return S
 
 @typechecked
-def simplify_F(I : IntegerSet, S_r : BiDict, a, b):
+def simplify_F(I : IntegerSet, S_r : BiDict, a, b, symbolic : bool = False, budget = None):
         """
         This function is the implementation of the Simplify function for the eventually operator. (Thesis page 20)
+        If symbolic is set, the formulas of each segment of trace positions are stored as one ResidualFamily.
         """
+        S_r = S_r.materialize()
         I_true, I_false = interval_F(S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
         S = BiDict()
         S.add_exp_in(Wahr(), I_true)
         S.add_exp_in(Falsch(), I_false)
         
         I = I.without(I_true.union(I_false))
+        simplify_window(S, "F", I, S_r, a, b, symbolic, budget)
+        return S
 
+def simplify_window(S : BiDict, op : str, I : IntegerSet, S_r : BiDict, a, b, symbolic : bool, budget = None):
+        """
+        Case 3 of simplify_G (op = "G") and simplify_F (op = "F"): adds the simplified formula at each t in I to S.
+        The loop stops once the time budget is used up, the remaining positions are left out (see Budget.fill).
+        """
         no_change_start_r = S_r.no_change_start()
+        sweep = WindowSweep(S_r, a, b)
+        families = {}               # shape -> family
+        positions = {}              # shape -> trace positions of the family
+        family = None
+        family_segment = None
+        tail = None
         for t in I:
-            outer_disjunctions = []
-            F = S_r.get_F()
-                                
-            for phi in F:
-                inner_disjunctions = []
-                if b == None:
-                    timestep_interval = (a+t, None)     # timestep_interval = [a+t,b+t]
-                else:
-                    timestep_interval = (a+t, b+t)
-                                    
-                partitions = IntegerSet.partition(S_r.get_I(phi).intersection(IntegerSet.from_interval(timestep_interval)))
-
-                for ivl in partitions:      # ivl = [x,y]
-                    new_ivl = ivl.copy()
-                    new_ivl[0] -= t
-                    if new_ivl[1] != None:
-                        new_ivl[1] -= t         # new_ivl = [x-t, b-t]
+            if out_of_time(budget):
+                break
+            segment = sweep.segment_at(t)
 
-                    inner_disjunctions.append(LTL.eventually(phi,new_ivl))         # F_[x-t, b-t] phi
-
-                if len(inner_disjunctions) == 0:
+            if symbolic and t < no_change_start_r:
+                if len(segment.terms) == 0:
                     continue
-                outer_disjunctions.append(LTL.disjunction(inner_disjunctions))
+                if segment is not family_segment:
+                    # first position of a new segment, segments of the same shape share one family
+                    family_segment = segment
+                    family = ResidualFamily(op, segment, sweep.segment_start)
+                    if family.shape in families:
+                        family = families[family.shape]
+                        family.add_start(sweep.segment_start)
+                    else:
+                        families[family.shape] = family
+                        positions[family.shape] = []
+                positions[family.shape].append(t)
+                continue
 
-            if len(outer_disjunctions) == 0:
+            simp_exp = residual(op, segment, t)
+
+            if simp_exp == None:
+                if t >= no_change_start_r:
+                    break
                 continue
-            
-            simp_exp = LTL.disjunction(outer_disjunctions)
 
             if t >= no_change_start_r:                               # At this point simplified formulas do not change anymore
-                rest = IntegerSet([t], True).intersection(I)
-                S.add_exp_in(simp_exp, rest)    
-                return S                        
+                tail = (simp_exp, IntegerSet([t], True).intersection(I))
+                break
             else:
                 S.add_exp_at(simp_exp, t)
-                            
-        return S
+
+        # families before the tail, so that materializing S keeps the order of the formulas
+        for shape, family in families.items():
+            S.add_exp_in(family, IntegerSet(positions[shape], False))
+        if tail != None:
+            S.add_exp_in(*tail)
 
 @typechecked
 def simplify_X(I : IntegerSet, S_r : BiDict, a):
@@ -239,7 +335,13 @@ def simplify_X(I : IntegerSet, S_r : BiDict, a):
         S.add_exp_in(Falsch(), I_false)
         
         I = I.without(I_true.union(I_false))
-        
+        simplify_X_case3(S, I, S_r, a)
+        return S
+
+def simplify_X_case3(S : BiDict, I : IntegerSet, S_r : BiDict, a):
+        """
+        Case 3 of simplify_X: adds the simplified formula at each t in I to S.
+        """
         no_change_start_r = S_r.no_change_start()
         for t in I:
             
@@ -248,12 +350,95 @@ def simplify_X(I : IntegerSet, S_r : BiDict, a):
             if t >= no_change_start_r:                               # At this point simplified formulas do not change anymore
                 rest = IntegerSet([t], True).intersection(I)
                 S.add_exp_in(simp_exp, rest)    
-                return S                        
+                return
             else:
                 S.add_exp_at(simp_exp, t)
-                            
+
+@typechecked
+def simplify_P(I : IntegerSet, S_r : BiDict, a):
+        """
+        Simplify function for the previously operator P[a] phi, the past counterpart of simplify_X.
+        """
+        I_true, I_false = interval_P(S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,None))
+        S = BiDict()
+        S.add_exp_in(Wahr(), I_true)
+        S.add_exp_in(Falsch(), I_false)
+
+        I = I.without(I_true.union(I_false))
+        simplify_P_case3(S, I, S_r, a)
         return S
 
+def simplify_P_case3(S : BiDict, I : IntegerSet, S_r : BiDict, a):
+        """
+        Case 3 of simplify_P: adds the simplified formula at each t in I to S.
+        """
+        no_change_start_r = S_r.no_change_start()
+        for t in I:
+
+            simp_exp = LTL.previously(S_r.get_at_timestep(t-a), a)
+
+            if t-a >= no_change_start_r:                             # At this point simplified formulas do not change anymore
+                rest = IntegerSet([t], True).intersection(I)
+                S.add_exp_in(simp_exp, rest)
+                return
+            else:
+                S.add_exp_at(simp_exp, t)
+
+@typechecked
+def simplify_O(I : IntegerSet, S_r : BiDict, a, b, exp = None):
+        """
+        Simplify function for the once operator O[a,b] phi, the past counterpart of simplify_F. In case 3 the simplified
+        formula at t is the disjunction of O[t-y, t-x] phi for all intervals [x,y] of S_r(phi) in the window [t-b, t-a].
+        With b = None the window always reaches back to trace position 0, so the simplified formulas never stop changing.
+        If I is infinite, the positions from which on S_r does not change anymore are therefore mapped to exp itself.
+        """
+        S_r = S_r.materialize()
+        I_true, I_false = interval_O(S_r.get_I(Wahr()), S_r.get_I(Falsch()), (a,b))
+        S = BiDict()
+        S.add_exp_in(Wahr(), I_true)
+        S.add_exp_in(Falsch(), I_false)
+
+        I = I.without(I_true.union(I_false))
+        simplify_O_case3(S, I, S_r, a, b, exp)
+        return S
+
+def simplify_O_case3(S : BiDict, I : IntegerSet, S_r : BiDict, a, b, exp = None):
+        """
+        Case 3 of simplify_O: adds the simplified formula at each t in I to S. S_r has to be materialized.
+        """
+        no_change_start_r = S_r.no_change_start()
+        unchanged_from = None
+        if b == None and I.is_inf():
+            assert exp != None, "simplify_O needs the original formula for unbounded intervals on infinite sets"
+            unchanged_from = max(I.min_inf_start(), no_change_start_r + a)
+
+        runs = ordered_runs(S_r)
+        for t in I:
+            if unchanged_from != None and t >= unchanged_from:
+                S.add_exp_in(exp, IntegerSet([t], True).intersection(I))
+                break
+
+            lo = 0 if b == None else max(t-b, 0)
+            hi = t-a
+            outer = []
+            for phi, phi_runs in runs:
+                windows = [(t - (hi if (y == None or y > hi) else y), t - max(x, lo)) for x, y in overlapping(phi_runs, lo, hi)]
+                if len(windows) > 0:
+                    outer.append(LTL.disjunction([LTL.once(phi, window) for window in windows]))     # O_[t-y, t-x] phi
+
+            if len(outer) == 0:
+                if b != None and t-b >= no_change_start_r:
+                    break
+                continue
+            simp_exp = LTL.disjunction(outer)
+
+            if b != None and t-b >= no_change_start_r:                # At this point simplified formulas do not change anymore
+                rest = IntegerSet([t], True).intersection(I)
+                S.add_exp_in(simp_exp, rest)
+                break
+            else:
+                S.add_exp_at(simp_exp, t)
+
 @typechecked
 def simplify_AND(I : IntegerSet, S_l : BiDict, S_r : BiDict):
         """
@@ -330,11 +515,47 @@ def simplify_IMP(I : IntegerSet, S_l : BiDict, S_r : BiDict):
         S_not_l = simplify_NOT(I, S_l)
         return simplify_OR(I, S_not_l,S_r)
 
+@typechecked
+def simplify_IFF(I : IntegerSet, S_l : BiDict, S_r : BiDict):
+        """
+        This function is the implementation of the Simplify function for the EQUIVALENCE operator.
+        """
+        I_true, I_false = interval_Iff(S_l.get_I(Wahr()), S_l.get_I(Falsch()), S_r.get_I(Wahr()), S_r.get_I(Falsch()))
+        S = BiDict()
+        S.add_exp_in(Wahr(), I_true)
+        S.add_exp_in(Falsch(), I_false)
+        I = I.without(I_true.union(I_false))
+
+        no_change_start = max(S_l.no_change_start(), S_r.no_change_start())
+        for t in I:
+            exp_l = S_l.get_at_timestep(t)
+            exp_r = S_r.get_at_timestep(t)
+
+            simp_exp = LTL.iff(exp_l, exp_r)
+            if exp_l == Wahr():
+                simp_exp = exp_r
+            elif exp_l == Falsch():
+                simp_exp = LTL._not(exp_r)
+            elif exp_r == Wahr():
+                simp_exp = exp_l
+            elif exp_r == Falsch():
+                simp_exp = LTL._not(exp_l)
+
+            if t >= no_change_start:                               # At this point simplified formulas do not change anymore
+                rest = IntegerSet([t], True).intersection(I)
+                S.add_exp_in(simp_exp, rest)
+                break
+            else:
+                S.add_exp_at(simp_exp, t)
+
+        return S
+
 @typechecked
 def simplify_NOT(I : IntegerSet, S_r : BiDict):
         """
         This function is the implementation of the Simplify function for the OR operator. (Thesis page 16)
         """
+        S_r = S_r.materialize()
         S = BiDict()
         for exp in S_r.expressions():
             interval = S_r.get_I(exp)
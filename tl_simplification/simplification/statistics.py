@@ -0,0 +1,101 @@
+from typing import List
+
+from tl_simplification.ltl import *
+from tl_simplification.utils.int_set import IntegerSet, BiDict
+
+"""
+Running statistics about the evaluation of subformulas.
+
+With narrowing (SimplificationOptions.narrow) the operands of a conjunction or disjunction are simplified one after
+another and every operand only sees the positions that are not decided yet. This pays off most if operands that are cheap
+and decide many positions are simplified first. SimplificationStatistics records for every subformula (keyed by the formula
+itself) and every predicate (keyed by its name) how long it took to simplify and at which fraction of the positions it was true
+or false. The engine uses these numbers to choose the evaluation order of the operands. The simplified formulas keep
+the operand order of the specification.
+"""
+
+
+class SimplificationStatistics:
+
+    """
+    - subformulas : dict : exp -> record
+    - predicates  : dict : predicate name -> record
+    A record is a dict with the number of evaluations ("count"), the total time in seconds ("time"), the number of
+    evaluated positions ("positions") and the number of positions reduced to true ("true") and to false ("false").
+    """
+
+    def __init__(self):
+        self.subformulas = {}
+        self.predicates = {}
+
+    def record(self, exp : Expression, seconds : float, S : BiDict, I : IntegerSet):
+        # Adds one evaluation of exp at the positions I with the simplification mapping S
+        positions, true, false = measure(I, S.get_I(Wahr()).intersection(I), S.get_I(Falsch()).intersection(I))
+        records = [self.subformulas.setdefault(exp, new_record())]
+        if isinstance(exp, Predicate):
+            records.append(self.predicates.setdefault(exp.name, new_record()))
+
+        for rec in records:
+            rec["count"] += 1
+            rec["time"] += seconds
+            rec["positions"] += positions
+            rec["true"] += true
+            rec["false"] += false
+
+    def merge(self, other : 'SimplificationStatistics'):
+        # Adds the records of other, e.g. the statistics of a worker of SimplificationOptions.subtree_executor
+        for records, other_records in [(self.subformulas, other.subformulas), (self.predicates, other.predicates)]:
+            for key, other_rec in other_records.items():
+                rec = records.setdefault(key, new_record())
+                for field, value in other_rec.items():
+                    rec[field] += value
+
+    def get(self, exp : Expression):
+        # Returns the record of exp. Predicates without a record of their own fall back to the record of their name
+        rec = self.subformulas.get(exp)
+        if rec == None and isinstance(exp, Predicate):
+            rec = self.predicates.get(exp.name)
+        return rec
+
+    def rank(self, exp : Expression, forcing : Expression) -> float:
+        """
+        Expected time per decided position if exp is simplified first, where forcing (true or false) is the value that
+        decides the operator. Subformulas without statistics are ranked last.
+        """
+        rec = self.get(exp)
+        if rec == None or rec["positions"] == 0:
+            return float("inf")
+        selectivity = (rec["true"] if forcing == Wahr() else rec["false"]) / rec["positions"]
+        return (rec["time"] / rec["count"]) / max(selectivity, 1e-3)
+
+    def order(self, expressions : List[Expression], forcing : Expression) -> List[int]:
+        # Returns the indices of expressions in the order in which they should be simplified (stable for equal ranks)
+        ranks = [self.rank(exp, forcing) for exp in expressions]
+        return sorted(range(len(expressions)), key=lambda i: ranks[i])
+
+    def to_dict(self) -> dict:
+        return {"subformulas": {key: dict(rec) for key, rec in self.subformulas.items()},
+                "predicates": {key: dict(rec) for key, rec in self.predicates.items()}}
+
+    def from_dict(data : dict) -> 'SimplificationStatistics':
+        statistics = SimplificationStatistics()
+        statistics.subformulas = {key: dict(rec) for key, rec in data.get("subformulas", {}).items()}
+        statistics.predicates = {key: dict(rec) for key, rec in data.get("predicates", {}).items()}
+        return statistics
+
+
+def new_record() -> dict:
+        return {"count": 0, "time": 0.0, "positions": 0, "true": 0, "false": 0}
+
+
+def measure(I : IntegerSet, I_true : IntegerSet, I_false : IntegerSet):
+        # Counts the positions of I, I_true and I_false up to the first position after which none of them changes anymore
+        sets = [I, I_true, I_false]
+        limit = max([max(I_sub.int_set) for I_sub in sets if not I_sub.is_empty()], default=-1) + 1
+        counts = []
+        for I_sub in sets:
+            count = len([t for t in I_sub.int_set if t <= limit]) if not I_sub.is_empty() else 0
+            if I_sub.is_inf():
+                count += limit - max(I_sub.int_set)
+            counts.append(count)
+        return counts
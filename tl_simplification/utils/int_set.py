@@ -150,6 +150,36 @@ class IntegerSet():
         result_set = {x+n for x in self.int_set if x+n >= 0}
         return IntegerSet(result_set, self.to_inf)
 
+    @typechecked
+    def window_union(self, a : int, b = None) -> 'IntegerSet':
+        """
+        Returns {t+n | t in self, n in [a,b]} (b = None: n >= a). Overlapping and adjacent windows are merged,
+        windows that are further apart stay separate. Integers < 0 will be ignored
+        """
+        if self.is_empty():
+            return IntegerSet.empty()
+        if b == None:
+            return IntegerSet([max(0, self.min() + a)], True)
+
+        runs = []
+        for (x, y) in self.partition():
+            start = max(0, x + a)
+            end = None if y == None else y + b
+            if end != None and end < start:
+                continue
+            if len(runs) > 0 and (runs[-1][1] == None or start <= runs[-1][1] + 1):
+                runs[-1][1] = None if (end == None or runs[-1][1] == None) else max(runs[-1][1], end)
+            else:
+                runs.append([start, end])
+
+        int_set = set()
+        for (x, y) in runs:
+            if y == None:
+                int_set.add(x)              # the infinite run is always the last one
+            else:
+                int_set.update(range(x, y+1))
+        return IntegerSet(int_set, len(runs) > 0 and runs[-1][1] == None)
+
     @typechecked #checked
     def add(self, n : int):
         if not self.to_inf:
@@ -392,10 +422,8 @@ class BiDict:
         return list(self.key_to_value.keys())
 
     def get_F(self):
-        exps = self.expressions()
-        exps.remove(Falsch())
-        exps.remove(Wahr())
-        return exps
+        # All expressions except for true and false
+        return [exp for exp in self.expressions() if exp != Wahr() and exp != Falsch()]
 
     def get_J(self):
         # J represents the set of all simplifications
@@ -433,7 +461,34 @@ class BiDict:
     def get_at_timestep(self, timestep):
         for invl in self.intervals():
             if invl.contains(timestep):
-                return self.value_to_key[invl]
+                exp = self.value_to_key[invl]
+                if not isinstance(exp, Expression):
+                    # symbolic residual family (see simplification/segments.py)
+                    return exp.at(timestep)
+                return exp
+
+    def materialize(self):
+        # Returns an equivalent BiDict in which symbolic residual families are replaced by the formula at each of their trace positions
+        if all(isinstance(exp, Expression) for exp in self.expressions()):
+            return self
+
+        S = BiDict()
+        for exp in self.expressions():
+            if isinstance(exp, Expression):
+                S.add_exp_in(exp, self.get_I(exp))
+            else:
+                for t in self.get_I(exp):
+                    S.add_exp_at(exp.at(t), t)
+        return S
+
+    def restrict(self, I):
+        # Returns the part of the mapping at the trace positions in I
+        S_I = BiDict()
+        for exp in self.expressions():
+            I_exp = self.get_I(exp).intersection(I)
+            if not I_exp.is_empty():
+                S_I.add_exp_in(exp, I_exp)
+        return S_I
 
     def print(self):
         for intv in self.intervals():
@@ -445,11 +500,14 @@ class BiDict:
 
     def no_change_start(self):
         # returns the minimum value from which the formula does not change
-        intervals = self.intervals()
+        # A symbolic residual family gives a different formula at each position, so it never counts as unchanged
         start = -1
-        for I in intervals:
+        for exp, I in self.key_to_value.items():
+            if not isinstance(exp, Expression) and not I.is_empty():
+                start = max(start, I.max() + 1)
+        for I in self.intervals():
             if I.is_inf():
-                return I.min_inf_start()
+                return max(start, I.min_inf_start())
             elif not I.is_empty():
                 if I.min_complete_to_max_start() > start:
                     start = I.min_complete_to_max_start()